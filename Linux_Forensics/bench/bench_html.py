@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+# Бенчмарк HTML-вывода: прежний построчный generate_html_report() против
+# потокового generate_chunked_html_report() на синтетической шкале.
+#
+#   python3 bench/bench_html.py -rows 5000000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description="Benchmark HTML report writers.")
+parser.add_argument('-rows', type=int, default=5000000, help='number of synthetic timeline entries')
+parser.add_argument('-skip-legacy', action='store_true', help='do not run the single-table writer')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from timeline.html_report import generate_chunked_html_report  # noqa: E402
+from timeline.table import TimelineEntry  # noqa: E402
+from timeline.writers import generate_html_report  # noqa: E402
+
+
+# Функция генерации синтетических записей без хранения всей шкалы в памяти
+def synthetic_entries(rows):
+    users = ['root', 'www-data', 'postgres', 'alice', 'bob']
+    for i in range(rows):
+        yield TimelineEntry(1700000000 + i * 7 % 86400000, users[i % len(users)], '644',
+                            str(i * 37 % 10000000), f'/srv/data/d{i // 1000:05d}/file_{i:08d}.dat'.encode())
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, fn)) for root, _, files in os.walk(path) for fn in files)
+
+
+def report(name, elapsed, rows, size):
+    print(f"{name:>8}: {rows} rows, {size / 1048576:.1f} MiB in {elapsed:.2f}s "
+          f"({size / 1048576 / elapsed:.1f} MB/s, {rows / elapsed:.0f} rows/s)")
+
+
+def main():
+    args = parser.parse_args()
+    out = tempfile.mkdtemp(prefix='timeline-bench-html-')
+    try:
+        if not args.skip_legacy:
+            path = os.path.join(out, 'legacy.html')
+            started = time.perf_counter()
+            generate_html_report(synthetic_entries(args.rows), path)
+            report('legacy', time.perf_counter() - started, args.rows, os.path.getsize(path))
+
+        path = os.path.join(out, 'chunked', 'report.html')
+        os.makedirs(os.path.dirname(path))
+        started = time.perf_counter()
+        rows, _ = generate_chunked_html_report(synthetic_entries(args.rows), path)
+        report('chunked', time.perf_counter() - started, rows, dir_size(os.path.dirname(path)))
+    finally:
+        shutil.rmtree(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/python3
+# Бенчмарк всех этапов конвейера на синтетических данных (bench/synth.py):
+# обход дерева (find и встроенный обходчик), хэширование, разбор, отбор и
+# сортировка листинга (табличный и потоковый режимы, внешняя сортировка
+# -macb) и все форматы вывода. Результаты сравниваются с сохранённой базой
+# (-save-baseline): этап, ставший медленнее больше чем на -tolerance,
+# отмечается как регрессия, и скрипт завершается с кодом 1.
+#
+#   python3 bench/bench_pipeline.py -save-baseline        # до изменения
+#   python3 bench/bench_pipeline.py                       # после изменения
+#
+# Обход замеряется на прогретом кэше (первый проход не считается), время
+# этапа - лучшее из -repeat повторов.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import synth  # noqa: E402
+from timeline.collector import get_timeline, read_records  # noqa: E402
+from timeline.events import expand_events, external_sort  # noqa: E402
+from timeline.filters import filter_timeline, parse_timeline  # noqa: E402
+from timeline.table import TimelineEntry, TimelineTable  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ['walk', 'hash', 'parse', 'filter', 'sort', 'write']
+
+parser = argparse.ArgumentParser(description="Benchmark timeline pipeline stages against a stored baseline.")
+parser.add_argument('-lines', type=int, default=1000000, help='synthetic listing lines (default: 1000000)')
+parser.add_argument('-files', type=int, default=20000, help='files in the synthetic tree (default: 20000)')
+parser.add_argument('-depth', type=int, default=3, help='tree depth')
+parser.add_argument('-fanout', type=int, default=8, help='subdirectories per tree directory')
+parser.add_argument('-repeat', type=int, default=3, help='runs per stage, the best one counts (default: 3)')
+parser.add_argument('-stages', nargs='+', choices=STAGES, default=STAGES, help='stage groups to run')
+parser.add_argument('-workers', type=int, help='walker and hash threads')
+parser.add_argument('-seed', type=int, default=1, help='random seed of the synthetic data')
+parser.add_argument('-workdir', type=str, help='keep generated data here and reuse it between runs')
+parser.add_argument('-baseline', type=str, default=os.path.join(BENCH_DIR, 'baseline.json'),
+                    help='baseline file (default: bench/baseline.json)')
+parser.add_argument('-save-baseline', action='store_true', help='store this run as the new baseline')
+parser.add_argument('-tolerance', type=float, default=0.15,
+                    help='allowed slowdown against the baseline before failing (default: 0.15)')
+parser.add_argument('-json', type=str, metavar='FILE', help='also save results as JSON')
+
+
+# Функция чтения записей листинга (разделитель \0)
+def read_lines(path):
+    with open(path, 'rb') as f:
+        yield from read_records(f)
+
+
+# Функция прохода по генератору до конца; возвращает число элементов
+def drain(items):
+    count = 0
+    for _ in items:
+        count += 1
+    return count
+
+
+# Функция поиска размера выходного файла или каталога
+def output_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, fn)) for root, _, files in os.walk(path) for fn in files)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    # Функция замера: func() возвращает (строк, байт); считается лучший из повторов
+    def run(self, name, func, warmup=False):
+        if warmup:
+            func()
+        best = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            rows, size = func()
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best[0]:
+                best = (elapsed, rows, size)
+        elapsed, rows, size = best
+        self.results[name] = {'seconds': round(elapsed, 6), 'rows': rows, 'bytes': size,
+                              'rows_per_s': round(rows / elapsed, 1) if elapsed else None}
+        mbps = f"{size / 1048576 / elapsed:8.1f} MB/s" if size and elapsed else ' ' * 13
+        print(f"{name:<22}{rows:>10} rows {elapsed:>9.3f}s {rows / elapsed if elapsed else 0:>12.0f} rows/s {mbps}",
+              flush=True)
+
+
+# Функция подготовки синтетических данных (или их повторного использования в workdir)
+def prepare(args, workdir):
+    data = {}
+    params = f"{args.files}-{args.depth}-{args.fanout}-{args.seed}"
+    tree = os.path.join(workdir, f'tree-{params}')
+    if {'walk', 'hash'} & set(args.stages):
+        if not os.path.isdir(tree):
+            print(f"Generating tree: {args.files} files, depth {args.depth}, fan-out {args.fanout}")
+            created = synth.make_tree(tree + '.tmp', args.files, args.depth, args.fanout, seed=args.seed)
+            os.rename(tree + '.tmp', tree)
+            with open(tree + '.files', 'w', encoding='utf-8') as f:
+                json.dump([[path[len(tree) + 4:], size, link] for path, size, link in created], f)
+        with open(tree + '.files', encoding='utf-8') as f:
+            data['files'] = [(tree + path, size, link) for path, size, link in json.load(f)]
+        data['tree'] = tree
+    for kind, macb, stages in (('listing', False, {'parse', 'filter', 'sort', 'write'}), ('macb', True, {'sort'})):
+        if not stages & set(args.stages):
+            continue
+        path = os.path.join(workdir, f'{kind}-{args.lines}-{args.seed}.bin')
+        if not os.path.exists(path):
+            print(f"Generating {kind}: {args.lines} lines")
+            synth.write_listing(path + '.tmp', args.lines, macb=macb, seed=args.seed)
+            os.rename(path + '.tmp', path)
+        data[kind] = path
+    return data
+
+
+def bench_walk(bench, data, args):
+    for walker in ('find', 'native'):
+        def walk():
+            rows = size = 0
+            for line in get_timeline(walker, data['tree'], workers=args.workers):
+                rows += 1
+                size += len(line) + 1
+            return rows, size
+        bench.run(f'walk/{walker}', walk, warmup=True)
+    # Каждый файл (плюс файл с именем не в UTF-8) - ровно одна запись
+    rows = bench.results['walk/find']['rows']
+    if rows != len(data['files']) + 1:
+        print(f"{'':<22}note: {rows} records for {len(data['files']) + 1} files")
+
+
+def bench_hash(bench, data, args):
+    from timeline.hashing import hash_timeline
+    entries = [TimelineEntry(0, 'root', '644', str(size), path) for path, size, _ in data['files']]
+    for algorithm in ('md5', 'sha256'):
+        def run():
+            stats = {}
+            rows = drain(hash_timeline(entries, algorithm, args.workers, None, stats))
+            return rows, stats['bytes']
+        bench.run(f'hash/{algorithm}', run, warmup=True)
+
+
+def bench_listing(bench, data, args, workdir):
+    listing = data['listing']
+    listing_size = os.path.getsize(listing)
+    lines = args.lines
+    # Отбор: пользователь и диапазон дат, под который попадает около половины строк
+    user, start_ts, end_ts = 'alice', synth.START + synth.SPAN // 4, synth.START + synth.SPAN * 3 // 4
+
+    if 'parse' in args.stages:
+        bench.run('parse/stream', lambda: (drain(parse_timeline(read_lines(listing))), listing_size))
+        bench.run('parse/table', lambda: (len(TimelineTable.from_lines(read_lines(listing))), listing_size))
+    table = TimelineTable.from_lines(read_lines(listing))
+    everything = table.filter()
+    if 'filter' in args.stages:
+        # Число строк этапа отбора - число входных строк, а не прошедших отбор
+        def filter_table():
+            table.filter(user, start_ts, end_ts)
+            return lines, 0
+
+        # Потоковый отбор неотделим от разбора: замеряется разбор вместе с отбором
+        def filter_stream():
+            drain(filter_timeline(parse_timeline(read_lines(listing)), user, start_ts, end_ts))
+            return lines, listing_size
+        bench.run('filter/table', filter_table)
+        bench.run('parse+filter/stream', filter_stream)
+    if 'sort' in args.stages:
+        bench.run('sort/table', lambda: (len(table.argsort(everything)), 0))
+        # Внешняя сортировка -macb: буфер в половину строк листинга. Строка даёт в
+        # среднем больше двух событий, так что буфер меньше половины событий и
+        # порции сбрасываются на диск
+        buffer_rows = max(1000, lines // 2)
+
+        def macb():
+            stats = {}
+            drain(external_sort(expand_events(read_lines(data['macb'])), buffer_rows, stats=stats))
+            return stats['events'], 0
+        bench.run('sort/macb-external', macb)
+    if 'write' in args.stages:
+        bench_write(bench, table, table.argsort(everything), workdir)
+
+
+def bench_write(bench, table, order, workdir):
+    from timeline.columnar import generate_columnar_report
+    from timeline.html_report import generate_chunked_html_report
+    from timeline.writers import generate_csv_report, generate_html_report, print_timeline
+
+    out = os.path.join(workdir, 'out')
+
+    def writer(func, suffix):
+        def run():
+            path = out + suffix
+            # Порции -chunked пишутся в каталог <отчёт>_data рядом с отчётом
+            data_dir = os.path.splitext(path)[0] + '_data'
+            shutil.rmtree(data_dir, ignore_errors=True)
+            func(table.entries(order), path)
+            size = output_size(path) + output_size(data_dir)
+            return len(order), size
+        return run
+
+    def console(entries, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            print_timeline(entries, f)
+
+    bench.run('write/console', writer(console, '.txt'))
+    bench.run('write/csv', writer(generate_csv_report, '.csv'))
+    bench.run('write/html', writer(generate_html_report, '.html'))
+    bench.run('write/html-chunked', writer(generate_chunked_html_report, '-chunked.html'))
+    bench.run('write/columnar', writer(generate_columnar_report, '.npz'))
+
+
+# Функция описания машины и параметров: сравнение с базой имеет смысл
+# только на той же машине и тех же объёмах данных
+def environment(args):
+    return {'host': platform.node(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+            'lines': args.lines, 'files': args.files, 'depth': args.depth, 'fanout': args.fanout, 'seed': args.seed}
+
+
+# Функция сравнения с базой; возвращает число регрессий
+def compare(results, baseline, env, tolerance):
+    base_env = baseline.get('environment', {})
+    differs = [key for key in env if base_env.get(key) != env[key]]
+    if differs:
+        print(f"warning: baseline differs in {', '.join(differs)}; ratios are not comparable")
+    regressions = 0
+    print(f"\n{'stage':<22}{'baseline':>12}{'now':>12}{'ratio':>8}")
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base.get('rows_per_s') or not result['rows_per_s']:
+            print(f"{name:<22}{'-':>12}{result['rows_per_s'] or 0:>12.0f}")
+            continue
+        ratio = result['rows_per_s'] / base['rows_per_s']
+        verdict = ''
+        if ratio < 1 - tolerance:
+            verdict = '  REGRESSION'
+            regressions += 1
+        elif ratio > 1 + tolerance:
+            verdict = '  faster'
+        print(f"{name:<22}{base['rows_per_s']:>12.0f}{result['rows_per_s']:>12.0f}{ratio:>8.2f}{verdict}")
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='timeline-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    bench = Bench(args.repeat)
+    try:
+        data = prepare(args, workdir)
+        if 'walk' in args.stages:
+            bench_walk(bench, data, args)
+        if 'hash' in args.stages:
+            bench_hash(bench, data, args)
+        if {'parse', 'filter', 'sort', 'write'} & set(args.stages):
+            bench_listing(bench, data, args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    env = environment(args)
+    report = {'environment': env, 'results': bench.results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with -save-baseline first")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(bench.results, baseline, env, args.tolerance)
+    if regressions:
+        print(f"{regressions} stage(s) slower than the baseline by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
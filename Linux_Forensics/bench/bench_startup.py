@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# Бенчмарк времени запуска: python -X importtime для тонкой командной строки
+# (timeline_light.py/timeline_graph.py -h) и для модулей отдельных
+# возможностей. Проверяет, что при запуске не загружаются тяжёлые модули,
+# нужные только отдельным опциям; код возврата 1 означает регрессию.
+#
+#   python3 bench/bench_startup.py -runs 10 -max-ms 150
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Модули, которые не должны импортироваться до выбора соответствующей опции
+LAZY = ('matplotlib', 'numpy', 'hashlib', 'sqlite3', 'csv', 'html', 'concurrent.futures', 'subprocess', 'zipfile',
+        'pyarrow', 'timeline.packages')
+FEATURES = ('timeline.collector', 'timeline.table', 'timeline.walker', 'timeline.hashing', 'timeline.snapshot',
+            'timeline.html_report', 'timeline.columnar', 'timeline.writers', 'timeline.graph', 'timeline.verify')
+
+parser = argparse.ArgumentParser(description="Benchmark CLI startup and per-feature import time.")
+parser.add_argument('-runs', type=int, default=10, help='number of runs per command (the best one is reported)')
+parser.add_argument('-top', type=int, default=10, help='number of slowest imports to show')
+parser.add_argument('-max-ms', type=float, help='fail if CLI startup takes longer than this (best run)')
+
+
+# Функция разбора вывода -X importtime: список (модуль, собственное, суммарное время в мкс, вложенность)
+def parse_importtime(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+# Функция запуска команды runs раз: лучшее время в мс и разбор importtime лучшего запуска
+def measure(command, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=ROOT, capture_output=True,
+                                text=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        if best is None or elapsed < best[0]:
+            best = (elapsed, parse_importtime(result.stderr))
+    return best
+
+
+def main():
+    args = parser.parse_args()
+    failed = False
+
+    for script in ('timeline_light.py', 'timeline_graph.py'):
+        elapsed, rows = measure([script, '-h'], args.runs)
+        imported = {name for name, _, _, _ in rows}
+        total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+        print(f"{script} -h: {elapsed:.1f} ms wall, {total_ms:.1f} ms in imports, {len(rows)} modules")
+        for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[1])[:args.top]:
+            print(f"    {name:<40} self {self_us / 1000:6.2f} ms  cumulative {cumulative_us / 1000:6.2f} ms")
+        eager = [name for name in LAZY if name in imported]
+        if eager:
+            print(f"    REGRESSION: imported at startup: {', '.join(eager)}")
+            failed = True
+        if args.max_ms and elapsed > args.max_ms:
+            print(f"    REGRESSION: startup {elapsed:.1f} ms > {args.max_ms} ms")
+            failed = True
+
+    print("Per-feature import cost (cumulative, ms):")
+    for module in FEATURES:
+        _, rows = measure(['-c', f'import {module}'], max(1, args.runs // 2))
+        cumulative = next((cumulative for name, _, cumulative, _ in rows if name == module), 0)
+        heavy = [name for name in LAZY if any(row[0] == name for row in rows)]
+        print(f"    {module:<24} {cumulative / 1000:7.2f}  {' '.join(heavy)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
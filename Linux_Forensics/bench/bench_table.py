@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# Микробенчмарк разбора, фильтрации и сортировки: прежний цикл из
+# show_timeline() (двойной split, namedtuple на строку, sorted по кортежам)
+# против TimelineTable (столбцы, маски, argsort) на синтетических строках find.
+#
+#   python3 bench/bench_table.py -lines 10000000
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from timeline.table import TimelineTable, numpy  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Benchmark parse+filter+sort of find output.")
+parser.add_argument('-lines', type=int, default=10000000, help='number of synthetic find lines')
+
+LegacyEntry = namedtuple('LegacyEntry', ['timestamp', 'user', 'permissions', 'size', 'filename'])
+USERS = ['root', 'www-data', 'postgres', 'alice', 'bob']
+
+
+# Функция генерации записей (bytes) в формате find -printf "%C@;%y%m;%u;%s;%p"
+def synthetic_lines(count):
+    return [f'{1700000000 + i * 7919 % 50000000}.{i % 1000000:06d}0000;f644;{USERS[i % 5]};{i * 37 % 100000};'
+            f'/srv/data/d{i // 1000:05d}/file;{i:08d}.dat'.encode() for i in range(count)]
+
+
+# Прежняя реализация из show_timeline() для сравнения (над декодированными строками)
+def legacy(lines, user, start_ts, end_ts):
+    filtered_timeline = []
+    for fl in map(bytes.decode, lines):
+        data = fl.split(";")
+        ts = int(data[0].split('.')[0])
+        perm = data[1].lstrip('f')
+        u = data[2]
+        size = data[3]
+        fname = ";".join(fl.split(";")[4:])
+        if user and u != user:
+            continue
+        if start_ts and ts < start_ts:
+            continue
+        if end_ts and ts > end_ts:
+            continue
+        filtered_timeline.append(LegacyEntry(ts, u, perm, size, fname))
+    return sorted(filtered_timeline, reverse=True)
+
+
+def table(lines, user, start_ts, end_ts):
+    t = TimelineTable.from_lines(lines, user)
+    return t.argsort(t.filter(user, start_ts, end_ts))
+
+
+def report(name, func, lines, *fargs):
+    started = time.perf_counter()
+    result = func(lines, *fargs)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {len(lines)} lines -> {len(result)} rows in {elapsed:.2f}s ({len(lines) / elapsed:.0f} lines/s)")
+
+
+def main():
+    args = parser.parse_args()
+    lines = synthetic_lines(args.lines)
+    print(f"numpy: {'yes' if numpy is not None else 'no'}")
+    # Полная шкала (без фильтров) и выборка по пользователю и датам
+    for title, filters in (('no filters', (None, None, None)),
+                           ('-u alice + date range', ('alice', 1710000000, 1740000000))):
+        print(title)
+        report('legacy', legacy, lines, *filters)
+        report('table', table, lines, *filters)
+
+
+if __name__ == "__main__":
+    main()
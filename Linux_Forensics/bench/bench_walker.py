@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+# Бенчмарк обхода: find -printf против встроенного walker (timeline/walker.py)
+# на синтетическом дереве файлов.
+#
+#   python3 bench/bench_walker.py -files 1000000 -workers 16
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from subprocess import Popen, PIPE, DEVNULL
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import synth  # noqa: E402
+from timeline.collector import FIND_FORMAT, read_records  # noqa: E402
+from timeline.walker import walk_tree  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Benchmark find vs native walker.")
+parser.add_argument('-files', type=int, default=1000000, help='number of files in the synthetic tree')
+parser.add_argument('-depth', type=int, default=3, help='directory depth')
+parser.add_argument('-fanout', type=int, default=16, help='subdirectories per directory')
+parser.add_argument('-workers', type=int, help='native walker threads')
+parser.add_argument('-root', type=str, help='use an existing tree instead of generating one')
+parser.add_argument('-keep', action='store_true', help='keep the generated tree')
+
+
+def bench_find(root):
+    process = Popen(["find", root, "-xdev", "-type", "f", "-printf", FIND_FORMAT], stdout=PIPE, stderr=DEVNULL)
+    count = sum(1 for _ in read_records(process.stdout))
+    process.wait()
+    return count
+
+
+def bench_native(root, workers):
+    return sum(1 for _ in walk_tree(root, workers=workers))
+
+
+def report(name, func, *fargs):
+    started = time.perf_counter()
+    count = func(*fargs)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>8}: {count} files in {elapsed:.2f}s ({count / elapsed:.0f} files/s)")
+
+
+def main():
+    args = parser.parse_args()
+    root = args.root
+    if not root:
+        root = tempfile.mkdtemp(prefix='timeline-bench-')
+        print(f"Generating {args.files} files in {root}")
+        # Содержимое файлов обходу не важно: размер ограничен, чтобы не занимать диск
+        synth.make_tree(root, args.files, args.depth, args.fanout, max_size=16)
+    try:
+        # Первый проход прогревает кэш inode, чтобы оба бэкенда были в равных условиях
+        bench_find(root)
+        report('find', bench_find, root)
+        report('native', bench_native, root, args.workers)
+    finally:
+        if not args.root and not args.keep:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# Проверка исключений при сканировании образа: в синтетическом образе под
+# каждым шаблоном ignore_default.txt создаётся файл, рядом - файлы, которые
+# должны остаться. Оба обходчика запускаются с -root образа и файлом
+# исключений по умолчанию; код возврата 1, если исключённый файл попал в
+# шкалу или оставленный пропал.
+#
+#   python3 bench/check_image_exclude.py
+
+import argparse
+import csv
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+from timeline.exclude import load_ignore_file, parse_pattern  # noqa: E402
+
+CLI = os.path.join(HERE, '..', 'timeline_light.py')
+IGNORE_FILE = os.path.join(HERE, '..', 'ignore_default.txt')
+# Дополнительный шаблон re: проверяется на пути без корня образа
+EXTRA = ['re:/tmp/.*\\.swp']
+# Файлы, которые не исключены ни одним шаблоном (соседи исключённых каталогов)
+KEPT = ['/var/library/keep', '/usr/bin/keep', '/etc/passwd', '/tmp/notes.txt']
+
+parser = argparse.ArgumentParser(description="Check that image scans honour the default ignore file.")
+parser.add_argument('-ignore-file', type=str, default=IGNORE_FILE, metavar='FILE', help='exclusion patterns to check')
+parser.add_argument('-keep', action='store_true', help='keep the generated image')
+
+
+# Функция пути файла, который должен попасть под шаблон
+def excluded_path(pattern):
+    kind, value = parse_pattern(pattern)
+    if kind == 're':
+        return '/tmp/edit.swp'
+    return value.replace('*', 'x').rstrip('/') + '/excluded'
+
+
+# Функция создания пустого файла в образе
+def touch(root, path):
+    full = os.path.join(root, path.lstrip('/'))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    open(full, 'w').close()
+
+
+# Функция сканирования образа: множество путей шкалы без корня образа
+def scan(root, walker, ignore_file):
+    with tempfile.NamedTemporaryFile(suffix='.csv') as out:
+        subprocess.run([sys.executable, CLI, '-root', root, '-walker', walker, '-ignore-file', ignore_file,
+                        '-exclude', *EXTRA, '-csv', '-f', out.name], check=True, stdout=subprocess.DEVNULL)
+        with open(out.name, newline='') as f:
+            rows = list(csv.reader(f))[1:]
+    return {row[4][len(root):] for row in rows}
+
+
+def main():
+    args = parser.parse_args()
+    patterns = load_ignore_file(args.ignore_file) + EXTRA
+    excluded = sorted({excluded_path(pattern) for pattern in patterns})
+    root = tempfile.mkdtemp(prefix='timeline-image-')
+    failed = False
+    try:
+        for path in excluded + KEPT:
+            touch(root, path)
+        kept = set(KEPT)
+        for walker in ('find', 'native'):
+            paths = scan(root, walker, args.ignore_file)
+            leaked = sorted(set(excluded) & paths)
+            missing = sorted(kept - paths)
+            for path in leaked:
+                print(f"{walker}: excluded file in the timeline: {path}")
+            for path in missing:
+                print(f"{walker}: kept file missing from the timeline: {path}")
+            failed = failed or bool(leaked or missing)
+            print(f"{walker}: {len(paths)} files, {len(leaked)} leaked, {len(missing)} missing")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
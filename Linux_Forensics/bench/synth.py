@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+# Генераторы синтетических данных для бенчмарков: дерево файлов и листинги
+# в формате find -printf. Генерация детерминирована (-seed), поэтому на
+# одной машине замеры повторяемы, а данные не нужно хранить в репозитории.
+#
+#   python3 bench/synth.py tree /tmp/tree -files 100000 -depth 3 -fanout 8
+#   python3 bench/synth.py listing /tmp/listing.bin -lines 10000000
+
+import argparse
+import os
+import random
+
+USERS = ['root', 'www-data', 'postgres', 'alice', 'bob', 'daemon', 'nobody', 'mallory']
+UIDS = [0, 33, 106, 1000, 1001, 1, 65534, 1002]
+PERMS = ['644', '644', '644', '600', '755', '664', '4755', '777']
+# Размеры файлов и их веса: в основном мелкие, изредка большие
+SIZES = [0, 120, 900, 4096, 20000, 65536, 300000, 2000000]
+SIZE_WEIGHTS = [8, 20, 25, 20, 12, 8, 5, 2]
+EXTENSIONS = ['.log', '.conf', '.py', '.so', '.txt', '', '.gz', '.json']
+# Неудобные имена: разделитель полей, перевод строки, пробелы, не-ASCII,
+# байты не в UTF-8 (в дереве) и имя из одних точек
+ODD_NAMES = ['semi;colon', 'new\nline', 'two;;fields;x', ' lead space', 'юникод файл', 'tab\there', '...', 'trail;']
+ODD_BYTES = b'bad\xff\xfename'
+START = 1600000000
+SPAN = 200000000
+
+
+# Функция имени i-го файла; odd - доля неудобных имён
+def file_name(rnd, i, odd):
+    if rnd.random() < odd:
+        return f'{rnd.choice(ODD_NAMES)}{i}'
+    return f'f{i:07d}{rnd.choice(EXTENSIONS)}'
+
+
+# Функция создания дерева: depth уровней по fanout подкаталогов, в каждом
+# каталоге files // число_каталогов файлов. Доля hardlinks файлов создаётся
+# жёсткими ссылками на уже созданные файлы, доля odd получает неудобные имена.
+# Владельцы (uids) меняются, только если запуск от root. Время изменения и
+# доступа разбрасывается по SPAN секунд. Возвращает список (путь, размер, ссылка).
+def make_tree(root, files=100000, depth=3, fanout=8, hardlinks=0.02, odd=0.01, uids=None, max_size=None, seed=1):
+    rnd = random.Random(seed)
+    uids = UIDS if uids is None else uids
+    chown = hasattr(os, 'geteuid') and os.geteuid() == 0
+    dirs = [root]
+    level = [root]
+    for d in range(depth):
+        level = [os.path.join(parent, f'odd;dir\n{d}' if n == 1 and odd else f'd{d}_{n}')
+                 for parent in level for n in range(fanout)]
+        dirs.extend(level)
+    for path in dirs:
+        os.makedirs(path, exist_ok=True)
+    if odd:
+        # Имя с байтами не в UTF-8 - только через bytes
+        with open(os.path.join(os.fsencode(root), ODD_BYTES), 'wb') as f:
+            f.write(b'x')
+
+    created = []
+    buffer = b'\0' * (max_size or SIZES[-1])
+    for i in range(files):
+        path = os.path.join(dirs[i % len(dirs)], file_name(rnd, i, odd))
+        if created and rnd.random() < hardlinks:
+            target = rnd.choice(created)[0]
+            try:
+                os.link(target, path)
+            except FileExistsError:
+                continue
+            created.append((path, os.path.getsize(target), True))
+            continue
+        size = rnd.choices(SIZES, SIZE_WEIGHTS)[0]
+        if max_size is not None:
+            size = min(size, max_size)
+        with open(path, 'wb') as f:
+            f.write(buffer[:size])
+        mtime = START + rnd.randrange(SPAN)
+        os.utime(path, (mtime + rnd.randrange(86400), mtime))
+        if chown:
+            os.chown(path, rnd.choice(uids), -1)
+        created.append((path, size, False))
+    return created
+
+
+# Функция генерации записей листинга в формате find -printf "%C@;%y%m;%u;%s;%p"
+# (macb - "%A@;%T@;%C@;%B@;%y%m;%u;%s;%p"). newlines - оставлять ли переводы
+# строк в неудобных именах (записи разделяются \0, так что они допустимы).
+def listing_lines(lines, odd=0.001, newlines=True, macb=False, seed=1):
+    rnd = random.Random(seed)
+    odd_names = ODD_NAMES if newlines else [name for name in ODD_NAMES if '\n' not in name]
+    for i in range(lines):
+        ctime = START + rnd.randrange(SPAN)
+        frac = rnd.randrange(1000000000)
+        k = rnd.randrange(len(USERS))
+        if rnd.random() < odd:
+            name = f'{rnd.choice(odd_names)}{i}'
+        else:
+            name = f'f{i:08d}{EXTENSIONS[i % len(EXTENSIONS)]}'
+        path = f'/srv/d{i % 997:03d}/s{i % 31:02d}/{name}'
+        fields = f'f{PERMS[k]};{USERS[k]};{rnd.choices(SIZES, SIZE_WEIGHTS)[0]};{path}'
+        if macb:
+            mtime = ctime - rnd.randrange(3) * rnd.randrange(86400)
+            atime = mtime + rnd.randrange(2) * rnd.randrange(86400)
+            yield f'{atime}.{frac:09d}0;{mtime}.{frac:09d}0;{ctime}.{frac:09d}0;-1.-000000010;{fields}'
+        else:
+            yield f'{ctime}.{frac:09d}0;{fields}'
+
+
+# Функция записи листинга в файл (записи с завершающим \0, как у find
+# -printf "...\0"); возвращает размер файла
+def write_listing(path, lines, odd=0.001, newlines=True, macb=False, seed=1):
+    with open(path, 'wb') as f:
+        batch = []
+        for line in listing_lines(lines, odd, newlines, macb, seed):
+            batch.append(line)
+            if len(batch) >= 65536:
+                f.write('\0'.join(batch).encode('utf-8') + b'\0')
+                batch = []
+        if batch:
+            f.write('\0'.join(batch).encode('utf-8') + b'\0')
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic trees and find listings for benchmarks.")
+    parser.add_argument('kind', choices=['tree', 'listing'], help='what to generate')
+    parser.add_argument('path', help='tree root or listing file')
+    parser.add_argument('-files', type=int, default=100000, help='tree: number of files')
+    parser.add_argument('-depth', type=int, default=3, help='tree: directory depth')
+    parser.add_argument('-fanout', type=int, default=8, help='tree: subdirectories per directory')
+    parser.add_argument('-hardlinks', type=float, default=0.02, help='tree: fraction of files created as hardlinks')
+    parser.add_argument('-max-size', type=int, help='tree: cap file size in bytes')
+    parser.add_argument('-lines', type=int, default=1000000, help='listing: number of lines')
+    parser.add_argument('-macb', action='store_true', help='listing: MACB format')
+    parser.add_argument('-no-newlines', action='store_true', help='listing: no newlines in odd names')
+    parser.add_argument('-odd', type=float, help="fraction of odd names (';', newlines, non-UTF-8)")
+    parser.add_argument('-seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+    if args.kind == 'tree':
+        created = make_tree(args.path, args.files, args.depth, args.fanout, args.hardlinks,
+                            0.01 if args.odd is None else args.odd, max_size=args.max_size, seed=args.seed)
+        print(f"{len(created)} files in {args.path}")
+    else:
+        size = write_listing(args.path, args.lines, 0.001 if args.odd is None else args.odd, not args.no_newlines,
+                             args.macb, args.seed)
+        print(f"{args.lines} lines, {size / 1048576:.1f} MiB in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
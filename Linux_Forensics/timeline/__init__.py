@@ -0,0 +1 @@
+# Общие модули для скриптов timeline_light.py и timeline_graph.py
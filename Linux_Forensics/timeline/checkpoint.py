@@ -0,0 +1,86 @@
+# Контрольная точка обхода (-resume FILE) для продолжения прерванного сканирования.
+# После чтения каждого каталога встроенный обходчик сохраняет в SQLite его
+# записи (сжатые zlib) и подкаталоги. При запуске с тем же файлом каталоги из
+# контрольной точки не читаются заново: их записи берутся из файла, а обход
+# продолжается с непрочитанных каталогов. Каталоги пишутся пачками раз в
+# FLUSH_INTERVAL секунд, поэтому прерывание теряет не больше этого времени
+# работы. После успешного завершения запуска файл удаляется.
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (path BLOB PRIMARY KEY, records BLOB, subdirs BLOB);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+FLUSH_INTERVAL = 1.0
+
+
+class Checkpoint:
+    # options - параметры обхода (строки: корень, исключения, -macb); продолжить
+    # можно только обход с теми же параметрами, иначе ValueError
+    def __init__(self, path, options):
+        self.path = path
+        try:
+            self.db = sqlite3.connect(path)
+            # WAL: каталоги из пула потоков читаются, пока основной поток пишет новые
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+            stored = dict(self.db.execute("SELECT key, value FROM meta"))
+            if not stored:
+                self.db.executemany("INSERT INTO meta VALUES (?, ?)", options.items())
+                self.db.commit()
+            self.done = {row[0] for row in self.db.execute("SELECT path FROM dirs")}
+        except sqlite3.Error as e:
+            raise ValueError(f"{path}: cannot open checkpoint: {e}")
+        if stored and stored != options:
+            self.db.close()
+            changed = ', '.join(key for key in options if stored.get(key) != options[key])
+            raise ValueError(f"{path}: checkpoint was made with other options ({changed}), remove it to start over")
+        self.pending = []
+        self.flushed = time.monotonic()
+        self.local = threading.local()
+        self.readers = []
+
+    def _db(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            self.readers.append(db)
+        return db
+
+    # Вызывается walker из рабочих потоков: содержимое каталога из контрольной
+    # точки (записи, подкаталоги) или None, если каталог ещё не прочитан
+    def reuse_dir(self, path, st):
+        if path not in self.done:
+            return None
+        records, subdirs = self._db().execute("SELECT records, subdirs FROM dirs WHERE path=?", (path,)).fetchone()
+        return (zlib.decompress(records).split(b'\0') if records else [],
+                subdirs.split(b'\0') if subdirs else [])
+
+    # Вызывается walker из основного потока после чтения каталога; subdirs - (путь, stat)
+    def record_dir(self, path, records, subdirs):
+        if path in self.done:
+            return
+        self.pending.append((path, zlib.compress(b'\0'.join(records), 1) if records else None,
+                             b'\0'.join(sub for sub, _ in subdirs) or None))
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        self.db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", pending)
+        self.db.commit()
+        self.flushed = time.monotonic()
+
+    # Функция завершения: сканирование окончено, контрольная точка больше не нужна
+    def finish(self):
+        for db in self.readers:
+            db.close()
+        self.db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
@@ -0,0 +1,657 @@
+# Командная строка timeline_light.py и timeline_graph.py.
+# Аргументы разбираются в main(), а не при импорте, поэтому модули можно
+# импортировать из других скриптов. Модули отдельных возможностей (хэши,
+# снимки, пакеты, отчёты, графики) импортируются только при их выборе:
+# запуск с -csv или выводом в консоль не загружает matplotlib и hashlib.
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from timeline.defaults import DEFAULT_CACHE
+
+
+# Функция построения парсера аргументов; graph добавляет опцию -graph
+def build_parser(graph=False):
+    parser = argparse.ArgumentParser(description="Скрипт для сбора временной шкалы файлов.")
+    parser.add_argument('-c', action='store_true', help='show changed files of dpkg packages')
+    parser.add_argument('-verify-all', action='store_true', help='with -c: hash every package file, not only those changed since install')
+    parser.add_argument('-f', type=argparse.FileType('w'), help='outfile for timeline')
+    parser.add_argument('-html', action='store_true', help='output timeline in HTML format')
+    parser.add_argument('-chunked', action='store_true',
+                        help='with -html: write data as chunked JSON next to a virtualized viewer page (for large timelines)')
+    parser.add_argument('-csv', action='store_true', help='output timeline in CSV format')
+    if graph:
+        parser.add_argument('-graph', action='store_true', help='visualize timeline with a graph')
+    else:
+        parser.set_defaults(graph=False)
+    parser.add_argument('-u', type=str, help='filter by user')
+    parser.add_argument('-start-date', type=str, help='start date for filtering (DD.MM.YYYY)', required=False)
+    parser.add_argument('-end-date', type=str, help='end date for filtering (DD.MM.YYYY)', required=False)
+    parser.add_argument('-hash', type=str, choices=['md5', 'sha256'], help='choose hash type: md5 or sha256', required=False)
+    parser.add_argument('-exclude', nargs='+', required=False,
+                        help='paths to exclude from scanning: path prefixes, globs (glob:PATTERN) or regexes (re:REGEX)')
+    parser.add_argument('-ignore-file', type=str, metavar='FILE', help='file with exclusion patterns, one per line')
+    parser.add_argument('-columnar', action='store_true',
+                        help='output typed columnar timeline (.npz, or .parquet with pyarrow)')
+    parser.add_argument('-full', action='store_true', help='full scan with CSV output')
+    parser.add_argument('-stream', action='store_true', help='stream entries to the output unsorted with bounded memory')
+    parser.add_argument('-walker', choices=['find', 'native'], default='find', help='filesystem walker backend (default: find)')
+    parser.add_argument('-workers', type=int, help='number of threads for the native walker and hashing')
+    parser.add_argument('-hash-cache', type=str, metavar='DB', help='persistent hash cache file (SQLite)')
+    parser.add_argument('-no-packages', action='store_true', help='skip files owned by dpkg packages')
+    parser.add_argument('-package-cache', type=str, metavar='FILE', default=DEFAULT_CACHE,
+                        help=f'dpkg ownership index cache (default: {DEFAULT_CACHE})')
+    parser.add_argument('-snapshot', type=str, metavar='DB', help='save the scanned timeline into a snapshot file (SQLite)')
+    parser.add_argument('-diff-against', type=str, metavar='DB', help='report only files added, removed or changed since snapshot DB')
+    parser.add_argument('-trust-dir-times', action='store_true',
+                        help='with -walker native and -diff-against: reuse snapshot contents of directories whose '
+                             'mtime/ctime did not change (misses in-place edits of existing files)')
+    parser.add_argument('-progress', type=int, metavar='SEC', help='report scan progress every SEC seconds')
+    parser.add_argument('-root', type=str, default='/', metavar='PATH',
+                        help='root to scan, e.g. a mounted disk image (default: /); user names are taken from its etc/passwd')
+    parser.add_argument('-collect', type=str, metavar='FILE',
+                        help='only collect a compressed raw listing of ROOT into FILE for later -analyze')
+    parser.add_argument('-host', type=str, help='host name stored in the -collect listing (default: this host or ROOT name)')
+    parser.add_argument('-analyze', nargs='+', metavar='FILE',
+                        help='merge listings made by -collect into one timeline with a host column (parsed in -workers processes)')
+    parser.add_argument('-macb', action='store_true',
+                        help='collect access, modification, change and birth times (ns) as separate M/A/C/B events')
+    parser.add_argument('-sort-buffer', type=int, metavar='ROWS', default=2000000,
+                        help='with -macb: events sorted in memory before spilling sorted runs to disk (default: 2000000)')
+    parser.add_argument('-watch', action='store_true',
+                        help='after a baseline scan keep watching ROOT with inotify and append created (+), modified (~), '
+                             'chmod/chown (m) and deleted (-) files to the console or -csv output')
+    parser.add_argument('-watch-interval', type=float, metavar='SEC', default=1.0,
+                        help='with -watch: coalesce events per file over SEC seconds (default: 1.0)')
+    parser.add_argument('-triage', type=int, metavar='N',
+                        help='score files (SUID/SGID, world-writable, executables in tmp dirs, hidden dirs, unexpected '
+                             'owners, IOC matches) and output only the N most suspicious')
+    parser.add_argument('-ioc', type=str, metavar='FILE',
+                        help='with -triage: indicators, one per line: md5/sha256 hash [size] or size:BYTES')
+    parser.add_argument('-throttle', action='store_true',
+                        help='scan gently on production hosts: idle I/O class, nice 19, 1 worker by default, and pause '
+                             'while the system load or the disk queue is high')
+    parser.add_argument('-iops', type=int, metavar='N', help='throttle: max stat calls and read blocks per second')
+    parser.add_argument('-read-mbps', type=float, metavar='MB', help='throttle: max hashing read rate, MB/s')
+    parser.add_argument('-cpu', type=int, metavar='PERCENT', help='throttle: max CPU share of the scan, percent of one CPU')
+    parser.add_argument('-max-load', type=float, metavar='LOAD', default=1.0,
+                        help='throttle: pause while the 1-minute load average per CPU (without the scan) is above LOAD '
+                             '(default: 1.0, 0 disables)')
+    parser.add_argument('-max-queue', type=int, metavar='N', default=8,
+                        help='throttle: pause while more than N requests are in flight on the disk of ROOT '
+                             '(default: 8, 0 disables)')
+    parser.add_argument('-resume', type=str, metavar='FILE',
+                        help='with -walker native: checkpoint scanned directories (and hashes) to FILE; an interrupted '
+                             'scan run again with the same options continues from it. FILE is removed when the run ends')
+    parser.add_argument('-stats', action='store_true',
+                        help='report wall/CPU time, rows/s, MB/s and peak RSS for walk, parse, filter, sort, hash and write')
+    parser.add_argument('-stats-json', type=str, metavar='FILE', help='with -stats: also save the stage profile as JSON')
+    parser.add_argument('-profile', type=str, metavar='FILE',
+                        help='run under cProfile, save pstats to FILE and print the top functions')
+    parser.add_argument('-tracemalloc', type=int, metavar='N', help='trace allocations and print the top N allocation sites')
+    return parser
+
+
+# Функция проверки несовместимых опций: option не сочетается с перечисленными
+def check_conflicts(parser, option, args, names):
+    conflicts = [name for name in names if getattr(args, name.lstrip('-').replace('-', '_'))]
+    if conflicts:
+        parser.error(f"{option} cannot be combined with {', '.join(conflicts)}")
+
+
+# Функция таблицы пользователей для обхода: для корня / (и каталогов без
+# etc/passwd) имена берутся из системы, для образа - из его etc/passwd
+def root_users(root):
+    if root.rstrip('/') == '':
+        return None
+    from timeline.listing import read_passwd
+    return read_passwd(root) or None
+
+
+# Функция включения ограничения нагрузки (-throttle): понижает приоритеты
+# процесса и возвращает Throttle с бюджетами из аргументов или None
+def start_throttle(args):
+    if not args.throttle:
+        return None
+    from timeline.throttle import Throttle, lower_priority
+    lowered = lower_priority()
+    print(f"Throttled scan: {', '.join(lowered) or 'priorities unchanged'}", file=sys.stderr)
+    return Throttle(args.iops, args.read_mbps * 1e6 if args.read_mbps else None, args.cpu / 100 if args.cpu else None,
+                    args.max_load, args.max_queue, args.root)
+
+
+# Функция открытия контрольной точки -resume; ValueError, если файл создан с
+# другими параметрами обхода
+def open_checkpoint(args):
+    if not args.resume:
+        return None
+    from timeline.checkpoint import Checkpoint
+    options = {'root': args.root, 'exclude': '\0'.join(args.exclude or []), 'ignore_file': args.ignore_file or '',
+               'macb': str(args.macb)}
+    checkpoint = Checkpoint(args.resume, options)
+    if checkpoint.done:
+        print(f"Resuming from {args.resume}: {len(checkpoint.done)} directories already scanned", file=sys.stderr)
+    return checkpoint
+
+
+# Функция разбора -start-date/-end-date в секунды
+def date_range(args):
+    start_ts = int(datetime.datetime.strptime(args.start_date, '%d.%m.%Y').timestamp()) if args.start_date else None
+    end_ts = int(datetime.datetime.strptime(args.end_date, '%d.%m.%Y').timestamp()) if args.end_date else None
+    return start_ts, end_ts
+
+
+# Основная функция показа временной шкалы
+def show_timeline(args):
+    from timeline.collector import build_exclude, get_timeline
+    from timeline.filters import count_entries, filter_timeline, parse_timeline
+    from timeline.stats import PipelineStats
+
+    # Преобразование временных рамок, если они заданы
+    start_ts, end_ts = date_range(args)
+    stats = PipelineStats(args.stats or bool(args.stats_json))
+    # Приоритеты понижаются до запуска потоков и find: они наследуют их
+    throttle = start_throttle(args)
+    try:
+        checkpoint = open_checkpoint(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return
+
+    packages = None
+    if args.no_packages:
+        from timeline.packages import PackageIndex
+        try:
+            packages = PackageIndex.load(args.package_cache, args.workers, args.root)
+        except OSError as e:
+            print(f"-no-packages: cannot read the dpkg database: {e}", file=sys.stderr)
+            return
+        print("Files from repositories:", len(packages))
+
+    # Снимок пишется при -snapshot, а для -diff-against нужен хотя бы временный
+    snapshot = previous = None
+    if args.snapshot or args.diff_against:
+        from timeline.snapshot import Snapshot, PreviousSnapshot, check_format
+        if args.diff_against:
+            try:
+                check_format(args.diff_against)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return
+        snapshot = Snapshot(args.snapshot)
+        if args.diff_against and args.trust_dir_times:
+            previous = PreviousSnapshot(args.diff_against)
+
+    # Конвейер: сбор -> разбор -> фильтрация
+    counters = {}
+    exclude = build_exclude(args.ignore_file, args.exclude, args.root)
+    timeline = count_entries(get_timeline(args.walker, args.root, exclude, args.workers, args.progress, snapshot,
+                                          previous, root_users(args.root), args.macb, throttle, checkpoint),
+                             counters, 'files')
+    timeline = stats.wrap('walk', timeline, size=len)
+    console = not (args.html or args.columnar or args.csv or args.full or args.graph)
+    # Потоковый режим: записи уходят в вывод по мере поступления, без сортировки
+    streaming = args.stream or args.diff_against
+    # Табличный режим - по умолчанию; события -macb сортируются внешней сортировкой
+    tabular = not (streaming or args.macb)
+    # Граф строится по гистограмме, которая накапливается по ходу конвейера
+    histogram = None
+    if args.graph:
+        from timeline.graph import TimelineHistogram
+        histogram = TimelineHistogram()
+    sort_stats = {}
+    hash_stats = {}
+    if args.macb:
+        # Каждый файл даёт до четырёх событий; отбор по дате - по времени события
+        from timeline.events import entry_events, event_entries, expand_events, external_sort
+        events = stats.wrap('parse', expand_events(timeline, args.u, start_ts, end_ts, packages), inner='walk')
+        events = count_entries(events, counters, 'filtered')
+        last = 'parse'
+        if args.hash:
+            # До сортировки события файла идут подряд, и файл хэшируется один раз
+            from timeline.hashing import hash_timeline
+            hashed = hash_timeline(event_entries(events), args.hash, args.workers, args.hash_cache or args.resume,
+                                   hash_stats, throttle)
+            events = stats.wrap('hash', entry_events(hashed), inner=last)
+            last = 'hash'
+        if args.triage:
+            # Порядок задаёт оценка, сортировка по времени не нужна
+            filtered_timeline = event_entries(events)
+        else:
+            filtered_timeline = event_entries(stats.wrap('sort', external_sort(events, args.sort_buffer,
+                                                                               stats=sort_stats), inner=last))
+            last = 'sort'
+        if histogram:
+            filtered_timeline = histogram.observe(filtered_timeline)
+    elif streaming:
+        entries = stats.wrap('parse', parse_timeline(timeline), inner='walk')
+        entries = stats.wrap('filter', filter_timeline(entries, args.u, start_ts, end_ts, packages), inner='parse')
+        filtered_timeline = count_entries(entries, counters, 'filtered')
+        last = 'filter'
+        if histogram:
+            filtered_timeline = histogram.observe(filtered_timeline)
+    else:
+        # Табличный режим: строки разбираются в столбцы, отбор выполняется масками,
+        # а сортировка для вывода в консоль - argsort по столбцу времени
+        from timeline.table import TimelineTable
+        with stats.timed('parse', inner='walk') as stage:
+            table = TimelineTable.from_lines(timeline, args.u)
+            stage.rows = len(table)
+        with stats.timed('filter') as stage:
+            selected = table.filter(args.u, start_ts, end_ts, packages)
+            stage.rows = len(table)
+        counters['filtered'] = len(selected)
+        # Для -triage порядок задаёт оценка, а не время
+        if console and not args.triage:
+            with stats.timed('sort') as stage:
+                selected = table.argsort(selected)
+                stage.rows = len(selected)
+        if histogram:
+            histogram.add_table(table, selected)
+        filtered_timeline = table.entries(selected)
+        last = None
+
+    # Хэширование выполняется отдельным этапом до вывода (для -macb - до сортировки)
+    if args.hash and not args.macb:
+        from timeline.hashing import hash_timeline
+        # С -resume уже посчитанные хэши сохраняются в контрольной точке
+        filtered_timeline = hash_timeline(filtered_timeline, args.hash, args.workers, args.hash_cache or args.resume,
+                                          hash_stats, throttle)
+        if snapshot:
+            filtered_timeline = snapshot.record_hashes(filtered_timeline)
+        filtered_timeline = stats.wrap('hash', filtered_timeline, inner=last)
+        last = 'hash'
+
+    # Оценка подозрительности: дальше идут только N записей с наибольшей оценкой
+    triage_stats = {}
+    if args.triage:
+        from timeline.triage import TriageRules, load_iocs, triage_timeline
+        try:
+            iocs = load_iocs(args.ioc) if args.ioc else None
+        except (OSError, ValueError) as e:
+            print(f"Cannot load IOC list: {e}", file=sys.stderr)
+            return
+        rules = TriageRules(args.root, iocs)
+        filtered_timeline = stats.wrap('triage', triage_timeline(filtered_timeline, rules, args.triage, triage_stats),
+                                       inner=last)
+        last = 'triage'
+
+    if args.diff_against:
+        with stats.timed('write', inner=last):
+            show_diff(args, filtered_timeline, counters, snapshot, start_ts, end_ts, packages)
+        if args.hash:
+            from timeline.hashing import print_hash_stats
+            print_hash_stats(hash_stats)
+        finish_scan(throttle, checkpoint)
+        finish_stats(args, stats, hash_stats)
+        return
+
+    if tabular:
+        print("Files cnt:", counters['files'])
+        print("Filtered timeline:", counters['filtered'])
+        if not counters['filtered']:
+            print("No entries after filtering.")
+
+    with stats.timed('write', inner=last) as stage:
+        output_file = write_output(args, filtered_timeline, histogram)
+        stage.rows = counters['filtered']
+        if output_file and os.path.isfile(output_file):
+            stage.bytes = os.path.getsize(output_file)
+
+    if not tabular:
+        print("Files cnt:", counters['files'])
+        print("Filtered timeline:", counters['filtered'])
+    if sort_stats.get('runs'):
+        print(f"Sorted {sort_stats['events']} events in {sort_stats['runs']} runs spilled to disk")
+    if triage_stats:
+        # Этап оценки отдаёт только N записей, а оценивает все
+        if 'triage' in stats.stages:
+            stats.stages['triage'].rows = triage_stats['scored']
+        hashed = f", {triage_stats['hashed']} IOC size candidates hashed" if triage_stats['hashed'] else ''
+        print(f"Triage: {triage_stats['flagged']} of {triage_stats['scored']} entries flagged, "
+              f"top {min(args.triage, triage_stats['flagged'])} shown{hashed}")
+    if args.hash:
+        from timeline.hashing import print_hash_stats
+        print_hash_stats(hash_stats)
+    if snapshot:
+        snapshot.close()
+        print(f"Snapshot saved to {args.snapshot}")
+    finish_scan(throttle, checkpoint)
+    finish_stats(args, stats, hash_stats)
+
+
+# Функция завершения сканирования: итоги ограничения нагрузки и удаление
+# контрольной точки, которая после полного прохода не нужна
+def finish_scan(throttle, checkpoint):
+    if throttle:
+        print(throttle.summary(), file=sys.stderr)
+    if checkpoint:
+        checkpoint.finish()
+
+
+# Функция вывода итогов замеров (-stats, -stats-json)
+def finish_stats(args, stats, hash_stats):
+    if not stats.enabled:
+        return
+    if 'hash' in stats.stages:
+        stats.stages['hash'].bytes = hash_stats.get('bytes', 0)
+    stats.report()
+    if args.stats_json:
+        import platform
+        stats.write_json(args.stats_json, {'host': platform.node(), 'argv': sys.argv[1:],
+                                           'finished': datetime.datetime.now().isoformat(timespec='seconds')})
+        print(f"Stage profile saved to {args.stats_json}", file=sys.stderr)
+
+
+# Функция вывода временной шкалы в выбранном формате; возвращает имя файла отчёта
+def write_output(args, filtered_timeline, histogram):
+    from timeline.writers import print_timeline
+
+    # Выбор метода вывода: HTML, CSV или граф
+    if args.html:
+        output_file = args.f.name if args.f else 'timeline_report.html'
+        if args.chunked:
+            from timeline.html_report import generate_chunked_html_report
+            from timeline.writers import graph_html
+            extra_html = ''
+            if histogram:
+                # График строится после записи данных, когда гистограмма заполнена
+                extra_html = lambda: graph_html(histogram)  # noqa: E731
+            generate_chunked_html_report(filtered_timeline, output_file, extra_html)
+        else:
+            from timeline.writers import generate_html_report
+            generate_html_report(filtered_timeline, output_file, histogram, macb=args.macb, triage=bool(args.triage))
+        print(f"HTML report saved to {output_file}")
+        return output_file
+    if args.columnar:
+        from timeline.columnar import generate_columnar_report
+        output_file = args.f.name if args.f else 'timeline_report.npz'
+        generate_columnar_report(filtered_timeline, output_file)
+        print(f"Columnar timeline saved to {output_file}")
+        return output_file
+    if args.csv or args.full:
+        from timeline.writers import generate_csv_report
+        output_file = args.f.name if args.f else 'timeline_report.csv'
+        generate_csv_report(filtered_timeline, output_file, macb=args.macb, triage=bool(args.triage))
+        print(f"CSV report saved to {output_file}")
+        return output_file
+    if args.graph:
+        from timeline.graph import visualize_timeline
+        for _ in filtered_timeline:
+            pass
+        visualize_timeline(histogram)
+        return None
+    print_timeline(filtered_timeline, args.f, macb=args.macb, triage=bool(args.triage))
+    if args.f:
+        args.f.flush()
+        return args.f.name
+    return None
+
+
+# Функция вывода разницы с прошлым снимком (-diff-against); строки разницы
+# отбираются по -u, датам и -no-packages, как и сама шкала
+def show_diff(args, filtered_timeline, counters, snapshot, start_ts=None, end_ts=None, packages=None):
+    from timeline.filters import filter_diff
+    from timeline.table import decode_user
+    from timeline.writers import format_ctime, format_path_line, sizeof_fmt
+
+    # Проход по конвейеру заполняет снимок текущего состояния
+    for _ in filtered_timeline:
+        pass
+    print("Files cnt:", counters['files'])
+
+    outfile = args.f if args.f else sys.stdout
+    changes = 0
+    rows = filter_diff(snapshot.diff(args.diff_against), args.u, start_ts, end_ts, packages)
+    for status, ctime, perm, user, size, fname, file_hash in rows:
+        changes += 1
+        print("{}\t{:>8}\t{}\t{:>10}\t{:>20}\t{}\t{}".format(status, decode_user(user), perm.lstrip('f'),
+                                                          sizeof_fmt(size), format_ctime(int(ctime.split('.')[0])),
+                                                          format_path_line(fname), file_hash or 'N/A'), file=outfile)
+    print(f"Changes since {args.diff_against}:", changes)
+
+    if args.snapshot:
+        snapshot.close()
+        print(f"Snapshot saved to {args.snapshot}")
+    else:
+        snapshot.discard()
+
+
+# Функция наблюдения за изменениями (-watch): базовое сканирование по
+# возрастанию времени, затем строки по событиям inotify в том же выводе
+def watch_timeline(args):
+    import itertools
+    from timeline.collector import build_exclude, get_timeline
+    from timeline.filters import filter_timeline
+    from timeline.table import TimelineTable
+    from timeline.watch import Watcher
+
+    start_ts, end_ts = date_range(args)
+    packages = None
+    if args.no_packages:
+        from timeline.packages import PackageIndex
+        try:
+            packages = PackageIndex.load(args.package_cache, args.workers, args.root)
+        except OSError as e:
+            print(f"-no-packages: cannot read the dpkg database: {e}", file=sys.stderr)
+            return
+
+    exclude = build_exclude(args.ignore_file, args.exclude, args.root)
+    users = root_users(args.root)
+    # Watch ставятся до базового сканирования, чтобы не пропустить изменения во время него
+    watcher = Watcher(args.root, exclude, users=users)
+    print(f"Watching {len(watcher.dirs)} directories under {args.root}", file=sys.stderr)
+    if watcher.unwatched:
+        print(f"{watcher.unwatched} directories are not watched: fs.inotify.max_user_watches is exhausted",
+              file=sys.stderr)
+
+    table = TimelineTable.from_lines(get_timeline(args.walker, args.root, exclude, args.workers, args.progress,
+                                                  users=users), args.u)
+    selected = table.argsort(table.filter(args.u, start_ts, end_ts, packages), reverse=False)
+    watcher.remember(table.entries(range(len(table))))
+    live = filter_timeline(watcher.entries(args.watch_interval), args.u, start_ts, end_ts, packages)
+    timeline = itertools.chain(table.entries(selected), live)
+    try:
+        if args.csv or args.full:
+            from timeline.writers import generate_csv_report
+            output_file = args.f.name if args.f else 'timeline_report.csv'
+            print(f"Appending to {output_file}, press Ctrl+C to stop", file=sys.stderr)
+            generate_csv_report(timeline, output_file, status=True, flush=True)
+        else:
+            from timeline.writers import print_timeline
+            print_timeline(timeline, args.f, status=True, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+# Функция сбора сырого листинга (-collect) для последующего -analyze
+def collect_listing(args):
+    import socket
+    from timeline.collector import build_exclude, get_timeline
+    from timeline.listing import write_listing
+
+    root = args.root
+    host = args.host or (socket.gethostname() if root.rstrip('/') == '' else os.path.basename(root.rstrip('/')))
+    exclude = build_exclude(args.ignore_file, args.exclude, root)
+    throttle = start_throttle(args)
+    try:
+        checkpoint = open_checkpoint(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return
+    started = time.monotonic()
+    lines = get_timeline(args.walker, root, exclude, args.workers, args.progress, users=root_users(root),
+                         throttle=throttle, checkpoint=checkpoint)
+    count = write_listing(lines, args.collect, host, root)
+    print(f"Collected {count} files of {host} ({root}) in {time.monotonic() - started:.1f}s, "
+          f"listing saved to {args.collect}")
+    finish_scan(throttle, checkpoint)
+
+
+# Функция анализа листингов (-analyze): общая шкала по всем хостам
+def analyze_listings(args):
+    from timeline.listing import merge_listings
+    from timeline.writers import print_timeline
+
+    start_ts, end_ts = date_range(args)
+    hosts = []
+    try:
+        timeline = merge_listings(args.analyze, args.u, start_ts, end_ts, args.workers, hosts)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return
+    for host, files, filtered in hosts:
+        print(f"{host}: files {files}, filtered {filtered}")
+    print("Files cnt:", sum(files for _, files, _ in hosts))
+    print("Filtered timeline:", sum(filtered for _, _, filtered in hosts))
+
+    histogram = None
+    if args.graph:
+        from timeline.graph import TimelineHistogram
+        histogram = TimelineHistogram()
+        timeline = histogram.observe(timeline)
+
+    if args.html:
+        from timeline.writers import generate_html_report
+        output_file = args.f.name if args.f else 'timeline_report.html'
+        generate_html_report(timeline, output_file, histogram, hosts=True)
+        print(f"HTML report saved to {output_file}")
+    elif args.csv or args.full:
+        from timeline.writers import generate_csv_report
+        output_file = args.f.name if args.f else 'timeline_report.csv'
+        generate_csv_report(timeline, output_file, hosts=True)
+        print(f"CSV report saved to {output_file}")
+    elif args.graph:
+        from timeline.graph import visualize_timeline
+        for _ in timeline:
+            pass
+        visualize_timeline(histogram)
+    else:
+        print_timeline(timeline, args.f, hosts=True)
+
+
+# Функция показа изменённых файлов пакетов (-c)
+def show_changed_files(args):
+    from timeline.verify import verify_packages
+
+    stats = {}
+    started = time.monotonic()
+    result = verify_packages(args.workers, args.verify_all, stats)
+    outfile = args.f if args.f else sys.stdout
+    for fn in sorted(result['modified']):
+        print(fn, file=outfile)
+    for fn in sorted(result['conffiles']):
+        print(f"conffile: {fn}", file=outfile)
+    for fn in sorted(result['missing']):
+        print(f"missing: {fn}", file=outfile)
+    print(f"Checked {stats['files']} package files in {time.monotonic() - started:.1f}s: "
+          f"modified {len(result['modified'])}, modified conffiles {len(result['conffiles'])}, "
+          f"missing {len(result['missing'])}, unreadable {len(result['unreadable'])}")
+
+
+# Основная функция, обрабатывающая входные аргументы
+def main(argv=None, graph=False):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser(graph)
+    # Если нет аргументов, выводим подсказку
+    if not argv:
+        parser.print_help()
+        return 1
+    args = parser.parse_args(argv)
+    if args.analyze:
+        # Хэши, снимки и индекс пакетов относятся к живой системе, а не к листингам
+        check_conflicts(parser, '-analyze', args, ['-hash', '-snapshot', '-diff-against', '-no-packages', '-chunked',
+                                                   '-columnar', '-collect', '-macb'])
+    if args.watch:
+        # Наблюдение пишет только построчные выводы: консоль или CSV
+        check_conflicts(parser, '-watch', args, ['-snapshot', '-diff-against', '-collect', '-analyze', '-macb', '-html',
+                                                 '-columnar', '-graph', '-hash', '-c'])
+    if args.triage:
+        # Оценка выводит короткий список построчно: консоль, CSV или HTML
+        check_conflicts(parser, '-triage', args, ['-diff-against', '-watch', '-analyze', '-collect', '-chunked',
+                                                  '-columnar'])
+    elif args.ioc:
+        parser.error("-ioc requires -triage")
+    if args.macb:
+        # Снимки, листинги и колоночные выводы хранят одно время на файл
+        check_conflicts(parser, '-macb', args, ['-snapshot', '-diff-against', '-collect', '-chunked', '-columnar'])
+    if args.iops or args.read_mbps or args.cpu:
+        args.throttle = True
+    if args.throttle:
+        # Ограничивается обход и хэширование живой системы
+        check_conflicts(parser, '-throttle', args, ['-analyze', '-watch', '-c'])
+        if args.workers is None:
+            args.workers = 1
+    if args.resume:
+        # Контрольная точка сохраняет каталоги, которые читает встроенный обходчик
+        if args.walker != 'native':
+            parser.error("-resume requires -walker native")
+        check_conflicts(parser, '-resume', args, ['-analyze', '-watch', '-c', '-trust-dir-times'])
+        # Остановка по SIGTERM (timeout, systemd) завершается так же, как Ctrl+C
+        import signal
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    try:
+        if args.profile or args.tracemalloc:
+            profile_run(args, run)
+        else:
+            run(args)
+    except KeyboardInterrupt:
+        if not args.resume:
+            raise
+        print(f"Interrupted, progress saved to {args.resume}: run again with the same options to continue",
+              file=sys.stderr)
+        return 130
+    return 0
+
+
+# Функция выбора режима работы по аргументам
+def run(args):
+    if args.c:
+        print("Showing changed files")
+        show_changed_files(args)
+    elif args.collect:
+        collect_listing(args)
+    elif args.analyze:
+        analyze_listings(args)
+    elif args.watch:
+        watch_timeline(args)
+    else:
+        show_timeline(args)
+
+
+# Функция запуска под cProfile (-profile) и/или tracemalloc (-tracemalloc);
+# итоги выводятся в stderr и при прерывании по Ctrl+C
+def profile_run(args, func):
+    profiler = None
+    if args.tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        if profiler:
+            profiler.runcall(func, args)
+        else:
+            func(args)
+    finally:
+        if profiler:
+            import pstats
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+            print(f"cProfile stats saved to {args.profile}", file=sys.stderr)
+        if args.tracemalloc:
+            # Загрузка модулей при ленивом импорте не относится к горячему пути
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+                                                                  tracemalloc.Filter(False, '<frozen abc>')])
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Traced memory: current {current / 1048576:.1f} MiB, peak {peak / 1048576:.1f} MiB", file=sys.stderr)
+            for line in snapshot.statistics('lineno')[:args.tracemalloc]:
+                print(line, file=sys.stderr)
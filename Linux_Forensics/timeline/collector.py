@@ -0,0 +1,129 @@
+# Сбор записей временной шкалы в формате find -printf "%C@;%y%m;%u;%s;%p".
+# Бэкенд выбирается параметром walker: внешний find или встроенный обходчик
+# (timeline.walker). Модули бэкендов импортируются только при выборе.
+#
+# Записи - bytes без разделителя: find печатает их через \0, поэтому имена
+# с переводами строк и байтами не в UTF-8 не ломают разбор, а путь как
+# последнее поле может содержать ';'. Вывод не декодируется: поля
+# разбиваются split(b';', maxsplit), путь остаётся в байтах до вывода.
+
+import sys
+import time
+
+from timeline.exclude import ExcludeMatcher, load_ignore_file
+
+FIND_FORMAT = "%C@;%y%m;%u;%s;%p\\0"
+MACB_FORMAT = "%A@;%T@;%C@;%B@;%y%m;%u;%s;%p\\0"
+READ_SIZE = 1 << 20
+
+
+# Функция чтения записей, разделённых \0, из двоичного потока. Поток читается
+# блоками; неполная запись в конце блока переносится в следующий, данные
+# блока не копируются повторно.
+def read_records(stream, size=READ_SIZE):
+    read = getattr(stream, 'read1', stream.read)
+    tail = b''
+    while chunk := read(size):
+        records = chunk.split(b'\0')
+        if tail:
+            records[0] = tail + records[0]
+        tail = records.pop()
+        yield from records
+    if tail:
+        yield tail
+
+
+# Функция сборки исключений из файла шаблонов и списка шаблонов
+def build_exclude(ignore_file=None, patterns=None, root='/'):
+    loaded = load_ignore_file(ignore_file) if ignore_file else []
+    return ExcludeMatcher(loaded + (patterns or []), root)
+
+
+# Функция чтения записей из find -printf.
+# Исключённые поддеревья отсекаются в самом find через -prune.
+# users - словарь uid -> имя (например, из /etc/passwd образа); без него
+# имена пользователей берёт сам find из системы, на которой он запущен.
+# macb - выводить времена доступа, изменения, inode и создания (%A@;%T@;%C@;%B@).
+# throttle ограничивает темп чтения записей; find, упираясь в заполненный канал,
+# ждёт вместе с ним.
+def get_find_lines(root, counters, exclude, users=None, macb=False, throttle=None):
+    import os
+    import tempfile
+    from subprocess import Popen, PIPE
+
+    # stderr пишется во временный файл, чтобы не заблокировать find при чтении stdout
+    with tempfile.TemporaryFile() as errfile:
+        fmt = MACB_FORMAT if macb else FIND_FORMAT
+        # Индекс поля пути; перед ним - пользователь и размер
+        path_field = fmt.count(';')
+        if users is not None:
+            # С таблицей пользователей образа find выводит числовой uid (%U)
+            fmt = fmt.replace('%u', '%U')
+            names = {uid: os.fsencode(name) for uid, name in users.items()}
+        process = Popen(["find", root, "-xdev"] + exclude.find_args() + ["-type", "f", "-printf", fmt],
+                        stdout=PIPE, stderr=errfile)
+        try:
+            for record in read_records(process.stdout):
+                if throttle:
+                    throttle.consume()
+                # Регулярные выражения find не понимает, они проверяются здесь
+                if exclude.needs_postfilter and exclude.excludes_under(
+                        os.fsdecode(record.split(b';', path_field)[path_field]), root):
+                    continue
+                if users is not None:
+                    fields = record.split(b';', path_field)
+                    fields[path_field - 2] = names.get(int(fields[path_field - 2])) or fields[path_field - 2]
+                    record = b';'.join(fields)
+                yield record
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        counters['errors'] = errfile.tell()
+
+
+# Функция для сбора данных о временной шкале файловой системы.
+# Строки отдаются генератором, поэтому память не зависит от количества
+# файлов на хосте. root - корень обхода (/ или смонтированный образ).
+# throttle - timeline.throttle.Throttle для ограничения нагрузки; checkpoint -
+# timeline.checkpoint.Checkpoint (только для встроенного обходчика): прочитанные
+# каталоги сохраняются в нём, а сохранённые ранее не читаются повторно.
+def get_timeline(walker='find', root='/', exclude=None, workers=None, progress=None, snapshot=None, previous=None,
+                 users=None, macb=False, throttle=None, checkpoint=None):
+    counters = {}
+    if exclude is None:
+        exclude = ExcludeMatcher([])
+    if walker == 'native':
+        from timeline.walker import walk_tree
+        reuse = checkpoint.reuse_dir if checkpoint else previous.reuse_dir if previous else None
+        lines = walk_tree(root, exclude, workers=workers, counters=counters,
+                          on_dir=snapshot.record_dir if snapshot else None, reuse=reuse, users=users, macb=macb,
+                          done=checkpoint.record_dir if checkpoint else None, throttle=throttle)
+    else:
+        lines = get_find_lines(root, counters, exclude, users, macb, throttle)
+    if snapshot:
+        lines = snapshot.record_lines(lines)
+
+    count = 0
+    started = last_report = time.monotonic()
+    try:
+        for line in lines:
+            count += 1
+            if progress:
+                now = time.monotonic()
+                if now - last_report >= progress:
+                    last_report = now
+                    print(f"Scanned {count} files in {now - started:.0f}s ({count / (now - started):.0f} files/s)",
+                          file=sys.stderr)
+            yield line
+    finally:
+        # И при прерывании: прочитанные каталоги остаются в контрольной точке
+        if checkpoint:
+            checkpoint.flush()
+
+    # Ограничение вывода ошибок для повышения безопасности в продакшене
+    if counters.get('errors'):
+        print(f"Errors from {walker} walker: <hidden for security reasons>")
+
+    if count == 0:
+        print(f"No data collected by {walker} walker.")
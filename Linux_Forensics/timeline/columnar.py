@@ -0,0 +1,199 @@
+# Колоночный двоичный экспорт временной шкалы (-columnar).
+#
+# Столбцы: ctime_ns (int64, наносекунды эпохи), size (int64), mode (uint16),
+# user (uint32, индекс в словаре users) и path. Данные пишутся группами
+# строк, поэтому в памяти держится только одна группа.
+#
+# Формат выбирается по расширению файла:
+#   .parquet  Parquet через pyarrow (если установлен): user - словарный
+#             столбец, path кодируется DELTA_BYTE_ARRAY (сжатие префиксов);
+#   иначе     NumPy .npz, который пишется без numpy: для группы k члены
+#             rgKKKKK_<столбец>.npy, пути сжаты фронтальным кодированием
+#             (path_prefix - длина общего с предыдущим путём префикса каталога
+#             в байтах, path_offsets/path_data - остатки путей), плюс users.npy.
+# read_columnar() читает оба формата обратно в словари столбцов.
+
+import ast
+import sys
+import zipfile
+from array import array
+
+from timeline.writers import format_path
+
+ROW_GROUP = 1000000
+
+
+# Функция построения заголовка .npy (формат 1.0) для одномерного массива
+def _npy_header(descr, count):
+    header = repr({'descr': descr, 'fortran_order': False, 'shape': (count,)})
+    header = header + ' ' * (63 - (len(header) + 10) % 64) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+
+# Функция построения .npy из array.array
+def _npy(data, descr):
+    if sys.byteorder == 'big' and data.itemsize > 1:
+        data = array(data.typecode, data)
+        data.byteswap()
+    return _npy_header(descr, len(data)) + data.tobytes()
+
+
+# Функция построения .npy со строками фиксированной ширины (<U), как хранит их numpy
+def _npy_strings(strings):
+    width = max((len(s) for s in strings), default=1) or 1
+    return _npy_header(f'<U{width}', len(strings)) + b''.join(s.ljust(width, '\0').encode('utf-32-le')
+                                                             for s in strings)
+
+
+# Функция перевода прав из вида '644' / 'f644' в число
+def _mode(perm):
+    return int(perm.lstrip('f') or '0', 8)
+
+
+class _NpzWriter:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.groups = 0
+
+    def write_group(self, ctime_ns, sizes, modes, user_ids, paths):
+        prefix = array('H')
+        offsets = array('q', [0])
+        data = bytearray()
+        previous = b''
+        for path in paths:
+            raw = path if isinstance(path, bytes) else path.encode('utf-8', errors='surrogateescape')
+            # Общий префикс считается по границам каталогов: соседние пути
+            # обычно лежат в одном каталоге, и проверка занимает один шаг
+            shared = raw.rfind(b'/', 0, 65535) + 1
+            while shared and not previous.startswith(raw[:shared]):
+                shared = raw.rfind(b'/', 0, shared - 1) + 1
+            prefix.append(shared)
+            data += raw[shared:]
+            offsets.append(len(data))
+            previous = raw
+
+        name = f'rg{self.groups:05d}_'
+        self.zip.writestr(name + 'ctime_ns.npy', _npy(array('q', ctime_ns), '<i8'))
+        self.zip.writestr(name + 'size.npy', _npy(array('q', sizes), '<i8'))
+        self.zip.writestr(name + 'mode.npy', _npy(array('H', modes), '<u2'))
+        self.zip.writestr(name + 'user.npy', _npy(array('I', user_ids), '<u4'))
+        self.zip.writestr(name + 'path_prefix.npy', _npy(prefix, '<u2'))
+        self.zip.writestr(name + 'path_offsets.npy', _npy(offsets, '<i8'))
+        self.zip.writestr(name + 'path_data.npy', _npy(array('B', data), '|u1'))
+        self.groups += 1
+
+    def close(self, users):
+        self.zip.writestr('users.npy', _npy_strings(users))
+        self.zip.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("pyarrow is required for Parquet output; use a .npz file name instead")
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([('ctime_ns', pyarrow.timestamp('ns')), ('size', pyarrow.int64()),
+                                      ('mode', pyarrow.uint16()), ('user', pyarrow.dictionary(pyarrow.uint32(),
+                                                                                             pyarrow.string())),
+                                      ('path', pyarrow.string())])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, use_dictionary=['user'],
+                                                    column_encoding={'path': 'DELTA_BYTE_ARRAY'})
+
+    def write_group(self, ctime_ns, sizes, modes, user_ids, paths, users):
+        pa = self.pa
+        user = pa.DictionaryArray.from_arrays(pa.array(user_ids, pa.uint32()), pa.array(users, pa.string()))
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(ctime_ns, pa.timestamp('ns')), pa.array(sizes, pa.int64()), pa.array(modes, pa.uint16()),
+             user, pa.array(list(map(format_path, paths)), pa.string())], schema=self.schema))
+
+    def close(self, users):
+        self.writer.close()
+
+
+# Функция колоночного экспорта. Записи группируются по row_group строк;
+# возвращает число записанных строк.
+def generate_columnar_report(timeline_data, output_file, row_group=ROW_GROUP):
+    parquet = output_file.endswith('.parquet')
+    writer = _ParquetWriter(output_file) if parquet else _NpzWriter(output_file)
+    user_ids = {}
+    rows = 0
+    group = []
+
+    def flush():
+        ctime_ns = [entry.timestamp_ns or entry.timestamp * 1000000000 for entry in group]
+        sizes = [int(entry.size) for entry in group]
+        modes = [_mode(entry.permissions) for entry in group]
+        ids = [user_ids.setdefault(entry.user, len(user_ids)) for entry in group]
+        paths = [entry.filename for entry in group]
+        if parquet:
+            writer.write_group(ctime_ns, sizes, modes, ids, paths, list(user_ids))
+        else:
+            writer.write_group(ctime_ns, sizes, modes, ids, paths)
+
+    for entry in timeline_data:
+        group.append(entry)
+        if len(group) >= row_group:
+            flush()
+            rows += len(group)
+            group = []
+    if group:
+        flush()
+        rows += len(group)
+    writer.close(list(user_ids))
+    return rows
+
+
+# Функция разбора .npy в array.array (или список строк для <U)
+def _read_npy(raw):
+    header_len = int.from_bytes(raw[8:10], 'little')
+    header = ast.literal_eval(raw[10:10 + header_len].decode('latin1'))
+    body = raw[10 + header_len:]
+    descr = header['descr']
+    if descr.startswith('<U'):
+        width = int(descr[2:])
+        text = body.decode('utf-32-le')
+        return [text[i:i + width].rstrip('\0') for i in range(0, len(text), width)]
+    result = array({'<i8': 'q', '<u2': 'H', '<u4': 'I', '|u1': 'B'}[descr])
+    result.frombytes(body)
+    if sys.byteorder == 'big' and result.itemsize > 1:
+        result.byteswap()
+    return result
+
+
+# Функция чтения колоночного файла: отдаёт группы строк в виде словарей
+# столбцов ctime_ns, size, mode, user (строки) и path. Подходит для
+# pandas.DataFrame(group) и для загрузки в SIEM без разбора CSV.
+def read_columnar(path):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for i in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(i)
+            group = table.to_pydict()
+            group['ctime_ns'] = table.column('ctime_ns').cast('int64').to_pylist()
+            yield group
+        return
+
+    with zipfile.ZipFile(path) as zf:
+        users = _read_npy(zf.read('users.npy'))
+        names = sorted({name.split('_', 1)[0] for name in zf.namelist() if name.startswith('rg')})
+        for name in names:
+            column = lambda col: _read_npy(zf.read(f'{name}_{col}.npy'))  # noqa: E731
+            prefix, offsets, data = column('path_prefix'), column('path_offsets'), column('path_data').tobytes()
+            paths = []
+            previous = b''
+            for i, shared in enumerate(prefix):
+                previous = previous[:shared] + data[offsets[i]:offsets[i + 1]]
+                paths.append(previous.decode('utf-8', errors='surrogateescape'))
+            yield {'ctime_ns': list(column('ctime_ns')), 'size': list(column('size')),
+                   'mode': list(column('mode')), 'user': [users[i] for i in column('user')], 'path': paths}
+
+
+if __name__ == "__main__":
+    # Быстрый просмотр файла: python3 -m timeline.columnar report.npz
+    for group in read_columnar(sys.argv[1]):
+        for row in zip(group['ctime_ns'], group['user'], group['mode'], group['size'], group['path']):
+            print('{}\t{}\t{:o}\t{}\t{}'.format(*row))
@@ -0,0 +1,8 @@
+# Значения по умолчанию, нужные командной строке при разборе аргументов.
+# Модуль лёгкий (только os), чтобы парсер не загружал модули возможностей.
+
+import os
+
+# Кэш индекса файлов пакетов dpkg (timeline.packages)
+DEFAULT_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                             'forensics-timeline', 'dpkg-index')
@@ -0,0 +1,121 @@
+# Расширенная временная шкала (-macb): для каждого файла собираются время
+# доступа (A), изменения содержимого (M), изменения inode (C) и создания (B)
+# с точностью до наносекунд. Записи сбора (bytes) имеют формат
+# find -printf "%A@;%T@;%C@;%B@;%y%m;%u;%s;%p"; каждый файл превращается в
+# события - по одному на каждое различное время, совпадающие времена
+# объединяются в одно событие с флагами вида "MAC." (как у mactime).
+#
+# События сортируются внешней сортировкой: пока их меньше buffer_rows,
+# сортировка идёт в памяти, иначе отсортированные порции сбрасываются во
+# временные файлы (marshal блоками) и сливаются через heapq.merge.
+
+import heapq
+import marshal
+import tempfile
+from operator import itemgetter
+
+from timeline.table import TimelineEntry, decode_user
+
+NS = 1000000000
+# Индекс поля пути в строке MACB
+PATH_FIELD = 7
+SORT_BUFFER = 2000000
+SPILL_BLOCK = 65536
+EVENT_TIME = itemgetter(0)
+
+
+# Функция перевода времени "сек.дробь" в наносекунды; неизвестное время
+# (find печатает -1.-000000010 без поддержки statx, обходчик - "-") - None
+def _ns(text):
+    if text.startswith(b'-'):
+        return None
+    sec, _, frac = text.partition(b'.')
+    return int(sec + frac[:9].ljust(9, b'0'))
+
+
+# Функция разбора записей MACB в события (время_нс, флаги, права, пользователь,
+# размер, путь, хэш) с отбором по пользователю, времени события и пакетам. Путь
+# остаётся в байтах, остальные поля декодируются один раз на файл (права и
+# имена пользователей - один раз на значение). События одного файла идут
+# подряд, от нового к старому: этапы до сортировки (хэширование, оценка)
+# обрабатывают файл один раз.
+def expand_events(records, user=None, start_ts=None, end_ts=None, packages=None):
+    start_ns = start_ts * NS if start_ts else None
+    end_ns = (end_ts + 1) * NS - 1 if end_ts else None
+    user = user.encode('utf-8', 'surrogateescape') if user else None
+    names = {}
+    modes = {}
+    for record in records:
+        atime, mtime, ctime, btime, perm, owner, size, path = record.split(b';', PATH_FIELD)
+        if user and owner != user:
+            continue
+        if packages and path in packages:
+            continue
+        perm = modes.get(perm) or modes.setdefault(perm, perm.lstrip(b'f').decode())
+        owner = names.get(owner) or names.setdefault(owner, decode_user(owner))
+        size = size.decode()
+        times = (_ns(mtime), _ns(atime), _ns(ctime), _ns(btime))
+        for ns in sorted({t for t in times if t is not None}, reverse=True):
+            if start_ns is not None and ns < start_ns:
+                continue
+            if end_ns is not None and ns > end_ns:
+                continue
+            flags = ''.join(letter if t == ns else '.' for letter, t in zip('MACB', times))
+            yield ns, flags, perm, owner, size, path, 'N/A'
+
+
+# Функция записи отсортированной порции во временный файл
+def _spill(rows):
+    run = tempfile.TemporaryFile(prefix='timeline-events-')
+    for i in range(0, len(rows), SPILL_BLOCK):
+        marshal.dump(rows[i:i + SPILL_BLOCK], run)
+    run.seek(0)
+    return run
+
+
+# Функция чтения порции из временного файла; файл закрывается по окончании
+def _read_run(run):
+    with run:
+        while True:
+            try:
+                block = marshal.load(run)
+            except EOFError:
+                return
+            yield from block
+
+
+# Функция внешней сортировки событий по времени (по умолчанию от новых к
+# старым). В памяти держится не больше buffer_rows событий плюс по блоку на
+# каждую сброшенную порцию. В stats записываются число событий и порций.
+def external_sort(events, buffer_rows=SORT_BUFFER, reverse=True, stats=None):
+    stats = {} if stats is None else stats
+    runs = []
+    buffer = []
+    total = 0
+    for event in events:
+        buffer.append(event)
+        if len(buffer) >= buffer_rows:
+            buffer.sort(key=EVENT_TIME, reverse=reverse)
+            runs.append(_spill(buffer))
+            total += len(buffer)
+            buffer = []
+    buffer.sort(key=EVENT_TIME, reverse=reverse)
+    stats['events'] = total + len(buffer)
+    stats['runs'] = len(runs)
+    if not runs:
+        yield from buffer
+        return
+    yield from heapq.merge(*map(_read_run, runs), buffer, key=EVENT_TIME, reverse=reverse)
+
+
+# Функция преобразования событий в записи TimelineEntry с флагами MACB
+def event_entries(events):
+    for ns, flags, perm, owner, size, path, file_hash in events:
+        yield TimelineEntry(ns // NS, owner, perm, size, path, file_hash, ns, '', flags)
+
+
+# Функция обратного преобразования записей TimelineEntry в события (после
+# хэширования, перед внешней сортировкой)
+def entry_events(entries):
+    for entry in entries:
+        yield entry.timestamp_ns, entry.macb, entry.permissions, entry.user, entry.size, entry.filename, entry.hash
@@ -0,0 +1,143 @@
+# Движок исключений: префиксы путей, glob-шаблоны и регулярные выражения.
+# Все шаблоны один раз компилируются в общее регулярное выражение
+# (префиксы - в виде префиксного дерева), которое используется и для
+# отсечения поддеревьев при обходе, и для отбора отдельных файлов.
+#
+# Синтаксис шаблона (в -exclude и в файле -ignore-file):
+#   /var/lib          путь: сам /var/lib и всё внутри (/var/lib/..., но не /var/library);
+#                      /var/cache/ с '/' на конце - только содержимое каталога
+#   glob:/home/*/.cache   glob, '*' совпадает и с '/' (как find -path);
+#                      путь со спецсимволами *?[ считается glob и без glob:,
+#                      /usr/lib/python* - простое совпадение начала пути
+#   re:.*\.swp        регулярное выражение Python на весь путь
+# Шаблоны проверяются и для файлов, и для каталогов: совпавший каталог
+# исключается целиком, в обоих обходчиках одинаково.
+# Пустые строки и строки с # в файле игнорируются.
+# Шаблоны пишутся от корня сканируемой системы: при -root /mnt/img префикс
+# /var/lib исключает /mnt/img/var/lib, glob:/home/* - /mnt/img/home/*, а re:
+# проверяется на пути без корня образа. Путь, уже начинающийся с корня
+# образа, и glob без ведущего '/' остаются как есть.
+
+import os
+import re
+from fnmatch import translate
+
+# Окончание префикса без '/' на конце: граница компонента пути
+BOUNDARY = '(?:/|\\Z)'
+
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+# Функция сборки регулярного выражения из префиксного дерева; лист '' хранит
+# окончание префикса: '' (любое продолжение) или BOUNDARY
+def _trie_regex(node):
+    if node.get('') == '':
+        # Префикс с '/' на конце уже покрывает все продолжения
+        return ''
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if '' in node:
+        branches.insert(0, node[''])
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+
+# Функция экранирования спецсимволов glob ([*] понимают и fnmatch, и find)
+def _glob_escape(path):
+    return GLOB_CHARS.sub(lambda m: '[' + m.group(0) + ']', path)
+
+
+# Функция разбора шаблона: ('prefix' | 'glob' | 're', значение)
+def parse_pattern(pattern):
+    if pattern.startswith('re:'):
+        return 're', pattern[3:]
+    if pattern.startswith('glob:'):
+        return 'glob', pattern[5:]
+    if GLOB_CHARS.search(pattern):
+        return 'glob', pattern
+    return 'prefix', pattern
+
+
+# Функция чтения шаблонов из файла исключений
+def load_ignore_file(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class ExcludeMatcher:
+    # root - корень обхода, на который переносятся шаблоны (см. описание выше)
+    def __init__(self, patterns=(), root='/'):
+        self.prefixes = []
+        self.globs = []
+        self.regexes = []
+        base = root.rstrip('/')
+        for pattern in patterns:
+            kind, value = parse_pattern(pattern)
+            if base and kind != 're' and value.startswith('/') and not value.startswith(base + '/'):
+                value = (base if kind == 'prefix' else _glob_escape(base)) + value
+            {'prefix': self.prefixes, 'glob': self.globs, 're': self.regexes}[kind].append(value)
+
+        trie = {}
+        for prefix in self.prefixes:
+            node = trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            if node.get('') != '':
+                node[''] = '' if prefix.endswith('/') else BOUNDARY
+        parts = [_trie_regex(trie)] if trie else []
+        parts += [translate(glob) for glob in self.globs]
+        parts += [f'{re.escape(base)}(?:{regex})\\Z' for regex in self.regexes]
+        self._match = re.compile('|'.join(f'(?:{part})' for part in parts)).match if parts else None
+
+        # Каталог D отсекается целиком, если ему совпадает D + '/' с префиксом
+        # или glob, оканчивающимся на '*': тогда совпадёт и любой путь внутри D
+        subtree = [_trie_regex(trie)] if trie else []
+        subtree += [translate(glob) for glob in self.globs if glob.endswith('*')]
+        self._subtree = re.compile('|'.join(f'(?:{part})' for part in subtree)).match if subtree else None
+        # Каталоги, проверенные для find (excludes_under)
+        self._dirs = {}
+
+    def __bool__(self):
+        return self._match is not None
+
+    # Функция проверки, исключён ли путь
+    def excludes(self, path):
+        return self._match is not None and self._match(path) is not None
+
+    # Функция проверки, нужно ли не заходить в каталог
+    def prunes(self, dirpath):
+        return self.excludes(dirpath) or (self._subtree is not None and self._subtree(dirpath + '/') is not None)
+
+    # Функция проверки файла из вывода find по регулярным выражениям: файл
+    # исключён, если совпал он сам или любой его каталог ниже root - так же,
+    # как встроенный обходчик отсекает совпавший каталог. Результаты для
+    # каталогов кэшируются.
+    def excludes_under(self, path, root):
+        if self.excludes(path):
+            return True
+        parent = os.path.dirname(path)
+        if len(parent) <= len(root.rstrip('/') or '/'):
+            return False
+        excluded = self._dirs.get(parent)
+        if excluded is None:
+            excluded = self._dirs[parent] = self.excludes_under(parent, root)
+        return excluded
+
+    # Функция построения аргументов find для отсечения: \( -path A -o ... \) -prune -o.
+    # Префикс X даёт -path X и -path X/*, префикс X/ - -path X/*.
+    # Регулярные выражения Python не переводятся в синтаксис find и проверяются
+    # уже после find (см. needs_postfilter и excludes_under).
+    def find_args(self):
+        paths = []
+        for prefix in self.prefixes:
+            escaped = GLOB_CHARS.sub(lambda m: '\\' + m.group(0), prefix)
+            paths += [escaped + '*'] if prefix.endswith('/') else [escaped, escaped + '/*']
+        paths += self.globs
+        if not paths:
+            return []
+        args = ['(']
+        for i, path in enumerate(paths):
+            args += (['-o'] if i else []) + ['-path', path]
+        return args + [')', '-prune', '-o']
+
+    @property
+    def needs_postfilter(self):
+        return bool(self.regexes)
@@ -0,0 +1,63 @@
+# Потоковые этапы конвейера: разбор записей find в TimelineEntry, фильтрация
+# и подсчёт записей. Используются в режиме -stream и для -diff-against;
+# табличный режим выполняет то же самое в timeline.table.
+
+from timeline.table import TimelineEntry, decode_user
+
+
+# Функция разбора записей find (bytes) в записи TimelineEntry; путь остаётся
+# в байтах, имена пользователей декодируются один раз на имя
+def parse_timeline(records):
+    users = {}
+    for record in records:
+        ts, perm, user, size, fname = record.split(b';', 4)
+        sec, _, frac = ts.partition(b'.')
+        name = users.get(user) or users.setdefault(user, decode_user(user))
+        yield TimelineEntry(int(sec), name, perm.lstrip(b'f').decode(), size.decode(), fname, 'N/A',
+                            int(sec + frac[:9].ljust(9, b'0')))
+
+
+# Функция фильтрации записей по пользователю, временным рамкам и принадлежности пакетам
+def filter_timeline(entries, user=None, start_ts=None, end_ts=None, packages=None):
+    for entry in entries:
+        # Фильтрация по пользователю
+        if user and entry.user != user:
+            continue
+        # Фильтрация по временным рамкам (если указана дата начала и/или конца)
+        if start_ts and entry.timestamp < start_ts:
+            continue
+        if end_ts and entry.timestamp > end_ts:
+            continue
+        # Файлы из пакетов дистрибутива
+        if packages and entry.filename in packages:
+            continue
+        yield entry
+
+
+# Функция фильтрации строк сравнения со снимком (статус, ctime, mode, user,
+# size, path, hash) по тем же правилам, что и filter_timeline: удалённые файлы
+# отбираются по их состоянию в прошлом снимке
+def filter_diff(rows, user=None, start_ts=None, end_ts=None, packages=None):
+    users = {}
+    for row in rows:
+        if user:
+            name = users.get(row[3]) or users.setdefault(row[3], decode_user(row[3]))
+            if name != user:
+                continue
+        if start_ts or end_ts:
+            timestamp = int(row[1].split('.')[0])
+            if start_ts and timestamp < start_ts:
+                continue
+            if end_ts and timestamp > end_ts:
+                continue
+        if packages and row[5] in packages:
+            continue
+        yield row
+
+
+# Функция подсчёта записей, проходящих через генератор
+def count_entries(entries, counters, key):
+    counters[key] = 0
+    for entry in entries:
+        counters[key] += 1
+        yield entry
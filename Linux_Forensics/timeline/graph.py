@@ -0,0 +1,223 @@
+# Графики временной шкалы по гистограммам вместо точки на каждый файл.
+# Записи сразу раскладываются по интервалам времени: число файлов на
+# интервал, по пользователям, по классам размера (степени двойки) и по
+# каталогам верхнего уровня. Ширина интервала подбирается по диапазону
+# времени из ряда кратных величин (1 с ... 336 дней) и при расширении
+# диапазона увеличивается с пересчётом уже накопленных интервалов, поэтому
+# память и время отрисовки зависят от числа интервалов, а не файлов.
+# Один и тот же объект используется и для окна -graph, и для PNG в HTML.
+
+import base64
+import datetime
+import io
+import operator
+import os
+from collections import Counter
+
+from timeline.writers import format_path
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NS = 1000000000
+MAX_BINS = 400
+# Каждая ширина кратна предыдущей, поэтому интервалы объединяются целочисленным делением
+UNITS = (1, 5, 15, 30, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400,
+         28 * 86400, 12 * 28 * 86400)
+TOP_USERS = 6
+TOP_DIRS = 15
+# Пути в байтах (как из сборщика); имя каталога декодируется при отрисовке
+SPLIT_DIR = operator.methodcaller('split', b'/', 2)
+TOP_DIR = operator.itemgetter(1)
+
+
+# Функция подписи класса размера: класс b содержит размеры [2^(b-1), 2^b)
+def _size_label(size_class):
+    if size_class == 0:
+        return '0B'
+    num = float(1 << size_class)
+    for unit in ['', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei']:
+        if num < 1024:
+            return f'<{num:.0f}{unit}B'
+        num /= 1024
+    return f'<{num:.0f}ZiB'
+
+
+class TimelineHistogram:
+    def __init__(self, max_bins=MAX_BINS):
+        self.max_bins = max_bins
+        self.width = UNITS[0]
+        self.min_ns = self.max_ns = None
+        self.total = 0
+        self.counts = Counter()
+        self.sizes = Counter()
+        self.users = Counter()
+        self.dirs = Counter()
+
+    # Функция расширения интервала, пока диапазон не уместится в max_bins
+    def _fit(self):
+        width = self.width
+        for unit in UNITS:
+            width = unit
+            if self.max_ns // (unit * NS) - self.min_ns // (unit * NS) < self.max_bins:
+                break
+        if width != self.width:
+            factor = width // self.width
+            self.counts = _merge(self.counts, factor)
+            self.sizes = _merge(self.sizes, factor)
+            self.users = _merge(self.users, factor)
+            self.dirs = _merge(self.dirs, factor)
+            self.width = width
+
+    # Функция добавления пачки записей в виде столбцов
+    def add_batch(self, timestamps_ns, sizes, users, paths):
+        if not timestamps_ns:
+            return
+        low, high = min(timestamps_ns), max(timestamps_ns)
+        self.min_ns = low if self.min_ns is None else min(self.min_ns, low)
+        self.max_ns = high if self.max_ns is None else max(self.max_ns, high)
+        self._fit()
+        step = self.width * NS
+        self.total += len(timestamps_ns)
+
+        if numpy is not None:
+            bins = numpy.asarray(timestamps_ns, dtype=numpy.int64) // step
+            classes = numpy.frexp(numpy.asarray(sizes, dtype=numpy.float64))[1]
+            keys, counts = numpy.unique(bins, return_counts=True)
+            self.counts.update(dict(zip(keys.tolist(), counts.tolist())))
+            keys, counts = numpy.unique(bins * 128 + classes, return_counts=True)
+            self.sizes.update({(k >> 7, k & 127): c for k, c in zip(keys.tolist(), counts.tolist())})
+            bins = bins.tolist()
+        else:
+            bins = list(map(step.__rfloordiv__, timestamps_ns))
+            self.counts.update(bins)
+            self.sizes.update(zip(bins, map(int.bit_length, sizes)))
+        self.users.update(zip(bins, users))
+        self.dirs.update(zip(bins, map(TOP_DIR, map(SPLIT_DIR, paths))))
+
+    # Функция накопления по потоку TimelineEntry: записи отдаются дальше без изменений
+    def observe(self, entries, batch=65536):
+        chunk = []
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) >= batch:
+                self.add_entries(chunk)
+                chunk = []
+            yield entry
+        self.add_entries(chunk)
+
+    def add_entries(self, entries):
+        self.add_batch([entry.timestamp_ns or entry.timestamp * NS for entry in entries],
+                       [int(entry.size) for entry in entries], [entry.user for entry in entries],
+                       [entry.filename for entry in entries])
+
+    # Функция добавления выбранных строк TimelineTable без создания записей
+    def add_table(self, table, indices):
+        self.add_batch(list(map(table.timestamp_ns.__getitem__, indices)), list(map(table.size.__getitem__, indices)),
+                       list(map(table.users.__getitem__, map(table.user_id.__getitem__, indices))),
+                       list(map(table.paths.__getitem__, indices)))
+
+    # Функция построения матрицы (строки - категории, столбцы - интервалы) для тепловой карты
+    def _matrix(self, counter, keys, first, count):
+        index = {key: i for i, key in enumerate(keys)}
+        matrix = [[0] * count for _ in keys]
+        for (b, key), value in counter.items():
+            if key in index:
+                matrix[index[key]][b - first] += value
+        return matrix
+
+    # Функция отрисовки: столбцы активности по пользователям и тепловые карты
+    # по классам размера и каталогам верхнего уровня
+    def render(self, figure):
+        import matplotlib.dates as mdates
+        from matplotlib.colors import LogNorm
+
+        first = min(self.counts)
+        count = max(self.counts) - first + 1
+        step = self.width
+        edges = [datetime.datetime.fromtimestamp((first + i) * step) for i in range(count + 1)]
+        x = mdates.date2num(edges)
+
+        per_user = Counter()
+        for (_, user), value in self.users.items():
+            per_user[user] += value
+        top_users = [user for user, _ in per_user.most_common(TOP_USERS)]
+        per_dir = Counter()
+        for (_, name), value in self.dirs.items():
+            per_dir[name] += value
+        top_dirs = [name for name, _ in per_dir.most_common(TOP_DIRS)]
+        classes = sorted({size_class for _, size_class in self.sizes})
+
+        ax_bars, ax_sizes, ax_dirs = figure.subplots(3, 1, sharex=True, gridspec_kw={'height_ratios': [2, 2, 3]})
+        bottom = [0] * count
+        user_rows = self._matrix(self.users, top_users, first, count)
+        other = [self.counts.get(first + i, 0) - sum(row[i] for row in user_rows) for i in range(count)]
+        for label, row in list(zip(top_users, user_rows)) + ([('other', other)] if any(other) else []):
+            ax_bars.bar(x[:-1], row, width=x[1:] - x[:-1], bottom=bottom, align='edge', label=label)
+            bottom = [b + r for b, r in zip(bottom, row)]
+        ax_bars.set_ylabel('Files')
+        ax_bars.legend(loc='upper left', fontsize='small')
+        ax_bars.set_title(f'File Modifications Timeline ({self.total} files, bin {datetime.timedelta(seconds=step)})')
+
+        for ax, keys, labels, counter in ((ax_sizes, classes, [_size_label(c) for c in classes], self.sizes),
+                                          (ax_dirs, top_dirs, ['/' + format_path(d) for d in top_dirs], self.dirs)):
+            matrix = self._matrix(counter, keys, first, count)
+            if numpy is not None:
+                matrix = numpy.ma.masked_equal(numpy.array(matrix), 0)
+            else:
+                matrix = [[value or float('nan') for value in row] for row in matrix]
+            mesh = ax.pcolormesh(x, range(len(keys) + 1), matrix, norm=LogNorm(), cmap='viridis', shading='flat')
+            ax.set_yticks([i + 0.5 for i in range(len(keys))])
+            ax.set_yticklabels(labels, fontsize='small')
+            figure.colorbar(mesh, ax=ax, label='Files')
+        ax_sizes.set_ylabel('Size')
+        ax_dirs.set_ylabel('Directory')
+        ax_dirs.xaxis_date()
+        figure.autofmt_xdate()
+
+
+# Функция объединения интервалов при увеличении ширины в factor раз
+def _merge(counter, factor):
+    merged = Counter()
+    for key, value in counter.items():
+        if isinstance(key, tuple):
+            merged[(key[0] // factor, key[1])] += value
+        else:
+            merged[key // factor] += value
+    return merged
+
+
+# Функция выбора backend matplotlib: без дисплея используется Agg
+def _pyplot():
+    import matplotlib
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# Функция для визуализации временной шкалы в окне
+def visualize_timeline(histogram):
+    if not histogram.total:
+        print("No data to generate a graph.")
+        return
+    plt = _pyplot()
+    figure = plt.figure(figsize=(12, 9))
+    histogram.render(figure)
+    plt.show()
+
+
+# Функция для создания графика и кодирования его в base64
+def generate_timeline_graph(histogram):
+    if not histogram.total:
+        return ''
+    plt = _pyplot()
+    figure = plt.figure(figsize=(12, 9))
+    histogram.render(figure)
+    # Сохраняем график в буфер
+    buf = io.BytesIO()
+    figure.savefig(buf, format='png', bbox_inches='tight')
+    plt.close(figure)
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
@@ -0,0 +1,160 @@
+# Этап хэширования файлов для -hash.
+# Хэши считаются в пуле потоков (hashlib отпускает GIL на больших блоках),
+# жёсткие ссылки на один inode хэшируются один раз, а результаты можно
+# сохранять в постоянный кэш, чтобы повторный разбор того же хоста
+# пересчитывал только изменившиеся файлы.
+
+import hashlib
+import os
+import sqlite3
+import stat
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+READ_SIZE = 1024 * 1024
+# Кэш пишется в базу каждые BATCH записей или FLUSH_INTERVAL секунд
+BATCH = 10000
+FLUSH_INTERVAL = 5.0
+
+
+# Функция вычисления хэша одного файла крупными блоками в переиспользуемый буфер;
+# throttle (timeline.throttle.Throttle) учитывает каждый прочитанный блок
+def hash_file(file_path, hash_algorithm='md5', throttle=None):
+    try:
+        hash_func = hashlib.new(hash_algorithm)
+        buf = bytearray(READ_SIZE)
+        view = memoryview(buf)
+        with open(file_path, 'rb', buffering=0) as f:
+            while n := f.readinto(buf):
+                if throttle:
+                    throttle.consume(1, n)
+                hash_func.update(view[:n])
+        return hash_func.hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+# Постоянный кэш хэшей в SQLite с ключом (dev, inode, size, mtime, ctime)
+class HashCache:
+    def __init__(self, path, hash_algorithm):
+        self.algorithm = hash_algorithm
+        self.pending = []
+        self.flushed = time.monotonic()
+        self.db = sqlite3.connect(path) if path else None
+        if self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS hashes (dev INTEGER, ino INTEGER, algo TEXT, "
+                            "size INTEGER, mtime INTEGER, ctime INTEGER, digest TEXT, "
+                            "PRIMARY KEY (dev, ino, algo))")
+
+    def get(self, st):
+        if not self.db:
+            return None
+        row = self.db.execute("SELECT size, mtime, ctime, digest FROM hashes WHERE dev=? AND ino=? AND algo=?",
+                              (st.st_dev, st.st_ino, self.algorithm)).fetchone()
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ctime_ns):
+            return row[3]
+        return None
+
+    def put(self, st, digest):
+        if not self.db:
+            return
+        self.pending.append((st.st_dev, st.st_ino, self.algorithm, st.st_size, st.st_mtime_ns, st.st_ctime_ns, digest))
+        if len(self.pending) >= BATCH or time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.db and self.pending:
+            self.db.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)", self.pending)
+            self.db.commit()
+        self.pending = []
+        self.flushed = time.monotonic()
+
+    def close(self):
+        if self.db:
+            self.flush()
+            self.db.close()
+
+
+# Функция хэширования записей временной шкалы.
+# Принимает поток TimelineEntry и отдаёт их в том же порядке с заполненным
+# полем hash. Вперёд читается ограниченное окно записей, так что этап
+# работает и в потоковом режиме без накопления всей шкалы. Подряд идущие
+# записи одного файла (события -macb) хэшируются один раз.
+# throttle - timeline.throttle.Throttle: stat и чтение файлов идут в его бюджете.
+def hash_timeline(entries, hash_algorithm, workers=None, cache_path=None, stats=None, throttle=None):
+    if stats is None:
+        stats = {}
+    stats.update(files=0, bytes=0, cached=0, duplicates=0)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    window_size = workers * 64
+    inodes = {}
+    cache = HashCache(cache_path, hash_algorithm)
+    started = time.monotonic()
+
+    def resolve(entry, st, result):
+        if isinstance(result, Future):
+            digest = result.result()
+            if st is not None and digest is not None and not result.cached:
+                result.cached = True
+                cache.put(st, digest)
+        else:
+            digest = result
+        return entry._replace(hash=digest or 'N/A')
+
+    window = deque()
+    previous = None
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for entry in entries:
+            if previous and previous[0].filename == entry.filename:
+                window.append((entry,) + previous[1:])
+                continue
+            if throttle:
+                throttle.consume()
+            try:
+                st = os.lstat(entry.filename)
+            except OSError:
+                previous = (entry, None, None)
+                window.append(previous)
+                continue
+            # Хэшируются только обычные файлы: FIFO или устройство заблокировали бы чтение
+            if not stat.S_ISREG(st.st_mode):
+                result = None
+            elif st.st_nlink > 1 and (st.st_dev, st.st_ino) in inodes:
+                result = inodes[(st.st_dev, st.st_ino)]
+                stats['duplicates'] += 1
+            elif (result := cache.get(st)) is not None:
+                stats['cached'] += 1
+            else:
+                result = pool.submit(hash_file, entry.filename, hash_algorithm, throttle)
+                result.cached = False
+                stats['files'] += 1
+                stats['bytes'] += st.st_size
+                if st.st_nlink > 1:
+                    inodes[(st.st_dev, st.st_ino)] = result
+            previous = (entry, st, result)
+            window.append(previous)
+
+            if len(window) >= window_size:
+                yield resolve(*window.popleft())
+        while window:
+            yield resolve(*window.popleft())
+    except BaseException:
+        # При прерывании ждём только уже начатые файлы, а не всё окно
+        pool.shutdown(wait=False, cancel_futures=True)
+        if throttle:
+            throttle.stop()
+        raise
+    finally:
+        pool.shutdown()
+        cache.close()
+        stats['elapsed'] = time.monotonic() - started
+
+
+# Функция вывода пропускной способности хэширования
+def print_hash_stats(stats, file=None):
+    elapsed = max(stats.get('elapsed', 0), 1e-9)
+    print(f"Hashed {stats['files']} files ({stats['bytes'] / 1048576:.1f} MiB) in {elapsed:.1f}s: "
+          f"{stats['bytes'] / 1048576 / elapsed:.1f} MB/s, {stats['files'] / elapsed:.0f} files/s; "
+          f"cache hits {stats['cached']}, hardlink duplicates {stats['duplicates']}", file=file)
@@ -0,0 +1,183 @@
+# Потоковый HTML-отчёт для больших временных шкал.
+# Данные пишутся порциями в JS-файлы (JSON внутри вызова timelineChunk(...),
+# чтобы страница открывалась и с file:// без веб-сервера) в каталог рядом
+# со страницей. Страница-просмотрщик загружает порции, держит данные в
+# столбцах и рисует только видимые строки таблицы; сортировка и фильтры по
+# пользователю, датам и пути выполняются в браузере.
+
+import datetime
+import html
+import json
+import os
+
+from timeline.writers import format_path
+
+CHUNK_ROWS = 50000
+
+VIEWER = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Forensic Timeline</title>
+<style>
+body {{ font-family: sans-serif; margin: 1em; }}
+#controls input, #controls select {{ margin-right: 1em; }}
+#scroller {{ height: 75vh; overflow-y: auto; position: relative; border: 1px solid #888; }}
+#rows {{ position: absolute; top: 0; left: 0; right: 0; border-collapse: collapse; table-layout: fixed; }}
+#rows td, #head th {{ height: 20px; padding: 0 6px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;
+                      font-size: 13px; border-bottom: 1px solid #eee; }}
+#head {{ width: 100%; table-layout: fixed; border-collapse: collapse; }}
+#head th {{ cursor: pointer; text-align: left; background: #ddd; }}
+.c0 {{ width: 8em; }} .c1 {{ width: 4em; }} .c2 {{ width: 6em; }} .c3 {{ width: 11em; }} .c5 {{ width: 18em; }}
+</style></head>
+<body><h1>Анализ выполнен {now}</h1>
+{extra}
+<h1>Timeline</h1>
+<div id="controls">
+Пользователь <select id="user"><option value="">все</option></select>
+С <input type="date" id="from"> по <input type="date" id="to">
+Путь <input type="text" id="path" size="40">
+<span id="status">Загрузка...</span>
+</div>
+<table id="head"><tr><th class="c0" data-col="u">Пользователь</th><th class="c1" data-col="p">Права</th>
+<th class="c2" data-col="s">Размер</th><th class="c3" data-col="t">Время изменения</th>
+<th class="c4" data-col="f">Файл</th><th class="c5" data-col="h">Хэш</th></tr></table>
+<div id="scroller"><div id="spacer"></div><table id="rows"><colgroup><col class="c0"><col class="c1"><col class="c2">
+<col class="c3"><col class="c4"><col class="c5"></colgroup><tbody id="body"></tbody></table></div>
+<script>
+const DATA = {data_dir};
+const ROW = 21;
+const cols = {{t: [], u: [], p: [], s: [], f: [], h: []}};
+let users = [], total = 0, view = new Uint32Array(0), sortCol = 't', sortDesc = true;
+
+function timelineManifest(m) {{
+  users = m.users; total = m.rows;
+  const sel = document.getElementById('user');
+  users.forEach((u, i) => sel.add(new Option(u, i)));
+  loadChunk(0, m.chunks);
+}}
+function timelineChunk(c) {{
+  for (const k of ['t', 'u', 'p', 's', 'f']) {{ const src = c[k], dst = cols[k]; for (let i = 0; i < src.length; i++) dst.push(src[i]); }}
+  const n = c.t.length;
+  for (let i = 0; i < n; i++) cols.h.push(c.h ? c.h[i] : 'N/A');
+}}
+function loadChunk(i, n) {{
+  if (i >= n) {{ cols.t = Float64Array.from(cols.t); cols.s = Float64Array.from(cols.s); cols.u = Uint32Array.from(cols.u); apply(); return; }}
+  document.getElementById('status').textContent = 'Загрузка ' + (i + 1) + '/' + n;
+  const s = document.createElement('script');
+  s.src = DATA + '/chunk-' + String(i).padStart(5, '0') + '.js';
+  s.onload = () => {{ s.remove(); loadChunk(i + 1, n); }};
+  document.body.appendChild(s);
+}}
+function esc(s) {{ return String(s).replace(/[&<>"]/g, c => ({{'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}})[c]); }}
+function fmtSize(n) {{
+  for (const u of ['', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi']) {{ if (Math.abs(n) < 1024) return n.toFixed(1) + u + 'B'; n /= 1024; }}
+  return n.toFixed(1) + 'YiB';
+}}
+function fmtTime(t) {{
+  const d = new Date(t * 1000), p = x => String(x).padStart(2, '0');
+  return d.getFullYear() + '-' + p(d.getMonth() + 1) + '-' + p(d.getDate()) + ' ' + p(d.getHours()) + ':' + p(d.getMinutes()) + ':' + p(d.getSeconds());
+}}
+function dayStart(id) {{ const v = document.getElementById(id).value; return v ? new Date(v + 'T00:00:00').getTime() / 1000 : null; }}
+function apply() {{
+  const user = document.getElementById('user').value, path = document.getElementById('path').value;
+  const from = dayStart('from'), to = dayStart('to'), u = user === '' ? -1 : +user;
+  const out = new Uint32Array(total); let n = 0;
+  for (let i = 0; i < total; i++) {{
+    if (u >= 0 && cols.u[i] !== u) continue;
+    if (from !== null && cols.t[i] < from) continue;
+    if (to !== null && cols.t[i] >= to + 86400) continue;
+    if (path && cols.f[i].indexOf(path) < 0) continue;
+    out[n++] = i;
+  }}
+  view = out.slice(0, n);
+  sort();
+}}
+function sort() {{
+  const c = cols[sortCol], d = sortDesc ? -1 : 1;
+  const key = sortCol === 'u' ? (i => users[c[i]]) : (i => c[i]);
+  view.sort((a, b) => {{ const x = key(a), y = key(b); return x < y ? -d : x > y ? d : 0; }});
+  document.getElementById('spacer').style.height = (view.length * ROW) + 'px';
+  document.getElementById('status').textContent = view.length + ' / ' + total;
+  render();
+}}
+function render() {{
+  const sc = document.getElementById('scroller');
+  const first = Math.floor(sc.scrollTop / ROW), last = Math.min(view.length, first + Math.ceil(sc.clientHeight / ROW) + 10);
+  let rows = '';
+  for (let r = first; r < last; r++) {{
+    const i = view[r];
+    rows += '<tr><td>' + esc(users[cols.u[i]]) + '</td><td>' + esc(cols.p[i]) + '</td><td>' + fmtSize(cols.s[i]) +
+            '</td><td>' + fmtTime(cols.t[i]) + '</td><td title="' + esc(cols.f[i]) + '">' + esc(cols.f[i]) + '</td><td>' + esc(cols.h[i]) + '</td></tr>';
+  }}
+  document.getElementById('rows').style.top = (first * ROW) + 'px';
+  document.getElementById('body').innerHTML = rows;
+}}
+document.getElementById('scroller').addEventListener('scroll', () => requestAnimationFrame(render));
+for (const id of ['user', 'from', 'to']) document.getElementById(id).addEventListener('change', apply);
+let timer; document.getElementById('path').addEventListener('input', () => {{ clearTimeout(timer); timer = setTimeout(apply, 300); }});
+document.querySelectorAll('#head th').forEach(th => th.addEventListener('click', () => {{
+  const c = th.dataset.col; sortDesc = c === sortCol ? !sortDesc : true; sortCol = c; sort();
+}}));
+</script>
+<script src="{manifest}"></script>
+</body></html>
+'''
+
+
+# Функция записи одной порции данных в JS-файл
+def _write_chunk(data_dir, index, chunk, user_ids):
+    # Транспонирование порции в столбцы выполняется zip без обращения к полям записей
+    timestamps, users, perms, sizes, filenames, hashes = list(zip(*chunk))[:6]
+    columns = {
+        't': timestamps,
+        'u': [user_ids.setdefault(user, len(user_ids)) for user in users],
+        'p': perms,
+        's': list(map(int, sizes)),
+        'f': list(map(format_path, filenames)),
+        'h': hashes if any(h != 'N/A' for h in hashes) else None,
+    }
+    path = os.path.join(data_dir, f'chunk-{index:05d}.js')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('timelineChunk(')
+        f.write(json.dumps(columns, ensure_ascii=False, separators=(',', ':')))
+        f.write(');\n')
+    return os.path.getsize(path)
+
+
+# Функция генерации потокового HTML-отчёта: страница output_file и каталог
+# <имя>_data с порциями данных. В памяти держится одна порция записей.
+# extra_html вставляется в страницу перед таблицей (например, график); если
+# это функция, она вызывается после записи данных, когда страница собирается.
+def generate_chunked_html_report(timeline_data, output_file, extra_html='', chunk_rows=CHUNK_ROWS):
+    base = output_file[:-5] if output_file.endswith('.html') else output_file
+    data_dir = base + '_data'
+    os.makedirs(data_dir, exist_ok=True)
+    for stale in os.listdir(data_dir):
+        if stale.startswith('chunk-') and stale.endswith('.js'):
+            os.remove(os.path.join(data_dir, stale))
+
+    user_ids = {}
+    chunks = rows = written = 0
+    chunk = []
+    for entry in timeline_data:
+        chunk.append(entry)
+        if len(chunk) >= chunk_rows:
+            written += _write_chunk(data_dir, chunks, chunk, user_ids)
+            chunks += 1
+            rows += len(chunk)
+            chunk = []
+    if chunk:
+        written += _write_chunk(data_dir, chunks, chunk, user_ids)
+        chunks += 1
+        rows += len(chunk)
+
+    manifest = {'chunks': chunks, 'rows': rows, 'users': list(user_ids)}
+    with open(os.path.join(data_dir, 'manifest.js'), 'w', encoding='utf-8') as f:
+        f.write(f'timelineManifest({json.dumps(manifest, ensure_ascii=False)});\n')
+
+    data_name = os.path.basename(data_dir)
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if callable(extra_html):
+        extra_html = extra_html()
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(VIEWER.format(now=now, extra=extra_html, data_dir=json.dumps(data_name),
+                              manifest=html.escape(f'{data_name}/manifest.js')))
+    return rows, written + os.path.getsize(output_file)
@@ -0,0 +1,123 @@
+# Сырые листинги для раздельного сбора и анализа (-collect / -analyze).
+#
+# Листинг - gzip: первая строка "#timeline-listing {json}" с именем хоста,
+# корнем и временем сбора, далее записи формата find -printf
+# "%C@;%y%m;%u;%s;%p", каждая с завершающим \0 (версия 2; в версии 1 записи
+# были текстовыми строками, такие листинги тоже читаются). При сборе с образа
+# (корень не /) пути записываются относительно корня образа, а имена
+# пользователей берутся из его /etc/passwd.
+#
+# Анализ разбирает листинги в пуле процессов: каждый процесс строит
+# TimelineTable, фильтрует и сортирует свой листинг, а итоговая шкала
+# получается слиянием уже отсортированных потоков через heapq.merge.
+
+import datetime
+import gzip
+import heapq
+import json
+import os
+from operator import attrgetter
+
+HEADER = b'#timeline-listing '
+VERSION = 2
+
+
+# Функция чтения таблицы пользователей uid -> имя из etc/passwd корня root
+def read_passwd(root):
+    users = {}
+    try:
+        with open(os.path.join(root, 'etc/passwd'), encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split(':')
+                if len(fields) > 2 and fields[2].isdigit():
+                    users.setdefault(int(fields[2]), fields[0])
+    except OSError:
+        pass
+    return users
+
+
+# Функция записи листинга; возвращает число записанных записей
+def write_listing(records, path, host, root='/'):
+    strip = len(os.fsencode(root.rstrip('/')))
+    meta = {'version': VERSION, 'host': host, 'root': root,
+            'collected': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')}
+    count = 0
+    with gzip.open(path, 'wb', compresslevel=3) as f:
+        f.write(HEADER + json.dumps(meta).encode() + b'\n')
+        for record in records:
+            if strip:
+                # Путь - последнее поле; корень образа отрезается от его начала
+                ts, perm, user, size, fname = record.split(b';', 4)
+                record = b'%s;%s;%s;%s;%s' % (ts, perm, user, size, fname[strip:])
+            f.write(record)
+            f.write(b'\0')
+            count += 1
+    return count
+
+
+# Функция открытия листинга: метаданные и генератор записей (bytes)
+def read_listing(path):
+    from timeline.collector import read_records
+
+    f = gzip.open(path, 'rb')
+    first = f.readline()
+    if not first.startswith(HEADER):
+        f.close()
+        raise ValueError("not a timeline listing")
+    meta = json.loads(first[len(HEADER):])
+
+    def records():
+        with f:
+            if meta.get('version', 1) < 2:
+                for line in f:
+                    yield line.rstrip(b'\n')
+            else:
+                yield from read_records(f)
+    return meta, records()
+
+
+# Функция обработки одного листинга в процессе пула: разбор в таблицу,
+# отбор и сортировка от новых к старым. Возвращает метаданные, число строк
+# листинга и таблицу только из отобранных строк в порядке сортировки.
+def load_listing(path, user=None, start_ts=None, end_ts=None):
+    from timeline.filters import count_entries
+    from timeline.table import TimelineTable
+
+    meta, lines = read_listing(path)
+    counters = {}
+    table = TimelineTable.from_lines(count_entries(lines, counters, 'files'), user)
+    selected = table.argsort(table.filter(user, start_ts, end_ts))
+    return meta, counters['files'], table.take(selected)
+
+
+# Функция анализа нескольких листингов: листинги разбираются параллельно в
+# workers процессах, отсортированные результаты сливаются k-путевым слиянием.
+# В hosts добавляются кортежи (хост, строк в листинге, отобрано).
+# Отсутствующий, обрезанный или испорченный листинг - ValueError с именем файла.
+def merge_listings(paths, user=None, start_ts=None, end_ts=None, workers=None, hosts=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(load_listing, path, user, start_ts, end_ts) for path in paths]
+        try:
+            for path, future in zip(paths, futures):
+                try:
+                    results.append(future.result())
+                except OSError as e:
+                    raise ValueError(f"{path}: cannot read listing: {e.strerror or e}")
+                except (EOFError, ValueError) as e:
+                    raise ValueError(f"{path}: truncated or malformed listing: {e}")
+        except ValueError:
+            for future in futures:
+                future.cancel()
+            raise
+
+    streams = []
+    for path, (meta, files, table) in zip(paths, results):
+        host = meta.get('host') or os.path.basename(path)
+        if hosts is not None:
+            hosts.append((host, files, len(table)))
+        streams.append(table.entries(range(len(table)), host))
+    return heapq.merge(*streams, key=attrgetter('timestamp_ns'), reverse=True)
@@ -0,0 +1,110 @@
+# Индекс файлов, принадлежащих пакетам dpkg.
+# Строится прямым чтением /var/lib/dpkg/info/*.list (или *.md5sums, если
+# .list нет) вместо медленного `dpkg -S '*'` и кэшируется на диске до
+# изменения /var/lib/dpkg/status. Пути хранятся в байтах, как в записях
+# сборщика. При сканировании образа (-root) читается база dpkg образа, а корень
+# отрезается от путей перед поиском.
+
+import marshal
+import os
+import zlib
+
+from timeline.defaults import DEFAULT_CACHE
+
+DPKG_INFO = '/var/lib/dpkg/info'
+DPKG_STATUS = '/var/lib/dpkg/status'
+CACHE_VERSION = 3
+
+
+# Функция пути к файлу базы dpkg внутри корня обхода
+def dpkg_path(root, path):
+    return os.path.join(root, path.lstrip('/'))
+
+
+# Функция чтения списка файлов одного пакета из каталога info
+def _read_package(info, name):
+    try:
+        with open(os.path.join(info, name + '.list'), 'rb') as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        pass
+    try:
+        with open(os.path.join(info, name + '.md5sums'), 'rb') as f:
+            # Формат md5sums: "<md5>  <путь без ведущего />"
+            return [b'/' + line.split(b'  ', 1)[1] for line in f.read().splitlines() if b'  ' in line]
+    except OSError:
+        return []
+
+
+# Индекс хранит пути, сжатые по общему префиксу каталога: каталог -> множество
+# имён файлов. Проверка принадлежности - один поиск в словаре и в множестве.
+class PackageIndex:
+    # root - корень обхода: пути в индексе даны от него и он отрезается при поиске
+    def __init__(self, tree, root='/'):
+        self.tree = tree
+        self.strip = len(os.fsencode(root.rstrip('/')))
+
+    # path - bytes или str (например, пути из -watch)
+    def __contains__(self, path):
+        if isinstance(path, str):
+            path = os.fsencode(path)
+        if self.strip:
+            path = path[self.strip:]
+        head, _, tail = path.rpartition(b'/')
+        names = self.tree.get(head or b'/')
+        return names is not None and tail in names
+
+    def __len__(self):
+        return sum(len(names) for names in self.tree.values())
+
+    # Функция построения индекса из ROOT/var/lib/dpkg/info в несколько потоков
+    @classmethod
+    def build(cls, workers=None, root='/'):
+        info = dpkg_path(root, DPKG_INFO)
+        names = sorted({fn.rsplit('.', 1)[0] for fn in os.listdir(info) if fn.endswith(('.list', '.md5sums'))})
+        tree = {}
+        # Пул потоков нужен только при построении индекса, а не при чтении кэша
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers or 8) as pool:
+            for paths in pool.map(_read_package, [info] * len(names), names):
+                for path in paths:
+                    head, _, tail = path.rpartition(b'/')
+                    tree.setdefault(head or b'/', set()).add(tail)
+
+        # usrmerge: dpkg хранит /bin/bash, а find видит /usr/bin/bash, поэтому
+        # каталоги добавляются и под своим реальным путём (в образе - внутри него)
+        base = os.fsencode(root.rstrip('/'))
+        for head in list(tree):
+            real = os.path.realpath(base + head)
+            if base:
+                if not real.startswith(base + b'/'):
+                    continue
+                real = real[len(base):]
+            if real != head:
+                tree.setdefault(real, set()).update(tree[head])
+        return cls({head: frozenset(tails) for head, tails in tree.items()}, root)
+
+    # Функция загрузки индекса из кэша; кэш сбрасывается при изменении mtime файла
+    # status или другом корне. Без базы dpkg в корне - OSError.
+    @classmethod
+    def load(cls, cache_path=DEFAULT_CACHE, workers=None, root='/'):
+        status_mtime = os.stat(dpkg_path(root, DPKG_STATUS)).st_mtime_ns
+        try:
+            with open(cache_path, 'rb') as f:
+                version, cached_root, mtime, tree = marshal.loads(zlib.decompress(f.read()))
+            if version == CACHE_VERSION and cached_root == root and mtime == status_mtime:
+                return cls({head: frozenset(tails) for head, tails in tree.items()}, root)
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            pass
+
+        index = cls.build(workers, root)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            data = (CACHE_VERSION, root, status_mtime, {head: tuple(sorted(tails)) for head, tails in index.tree.items()})
+            tmp_path = f'{cache_path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(marshal.dumps(data), 1))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+        return index
@@ -0,0 +1,161 @@
+# Хранилище снимков временной шкалы в SQLite и сравнение с прошлым снимком.
+# Снимок содержит все просканированные файлы (с хэшами, если был -hash)
+# и, при обходе встроенным walker, времена изменения каталогов.
+# Пути и имена пользователей хранятся как BLOB - байты без декодирования,
+# как в записях сборщика; снимки старого формата (пути в TEXT) не сравниваются.
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path BLOB PRIMARY KEY, parent BLOB, ctime TEXT, mode TEXT,
+                                  user TEXT, size INTEGER, hash TEXT);
+CREATE INDEX IF NOT EXISTS files_parent ON files (parent);
+CREATE INDEX IF NOT EXISTS files_ctime ON files (ctime);
+CREATE TABLE IF NOT EXISTS dirs (path BLOB PRIMARY KEY, parent BLOB, mtime INTEGER, ctime INTEGER);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+BATCH = 10000
+FORMAT = '2'
+
+
+# Функция проверки формата снимка; ValueError для снимков со старой схемой
+def check_format(path):
+    try:
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            row = db.execute("SELECT value FROM meta WHERE key='format'").fetchone()
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        raise ValueError(f"{path}: cannot read snapshot: {e}")
+    if not row or row[0] != FORMAT:
+        raise ValueError(f"{path}: snapshot format is outdated or unknown, create it again with -snapshot")
+
+
+# Запись нового снимка. Пишется во временный файл рядом с целевым и
+# атомарно подменяет его при закрытии, поэтому прерванный запуск не
+# портит прошлый снимок, а -snapshot и -diff-against могут совпадать.
+# Без пути снимок временный и нужен только для сравнения.
+class Snapshot:
+    def __init__(self, path=None):
+        self.path = path
+        if path:
+            self.tmp_path = f'{path}.tmp'
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        else:
+            fd, self.tmp_path = tempfile.mkstemp(suffix='.db', prefix='timeline-')
+            os.close(fd)
+        self.db = sqlite3.connect(self.tmp_path)
+        self.db.executescript(SCHEMA)
+        self.db.execute("INSERT INTO meta VALUES ('created', ?)", (str(time.time()),))
+        self.db.execute("INSERT INTO meta VALUES ('format', ?)", (FORMAT,))
+        self.files = []
+        self.dirs = []
+        # dirs пополняется из потоков walker, а забирается в flush() основным потоком
+        self.dirs_lock = threading.Lock()
+
+    # Этап конвейера: сохраняет записи формата %C@;%y%m;%u;%s;%p и отдаёт их дальше
+    def record_lines(self, records):
+        for record in records:
+            ctime, mode, user, size, path = record.split(b';', 4)
+            self.files.append((path, os.path.dirname(path), ctime.decode(), mode.decode(), user, int(size)))
+            if len(self.files) >= BATCH:
+                self.flush()
+            yield record
+
+    # Вызывается walker из рабочих потоков; запись в базу идёт в flush()
+    def record_dir(self, path, st):
+        row = (path, os.path.dirname(path), st.st_mtime_ns, st.st_ctime_ns)
+        with self.dirs_lock:
+            self.dirs.append(row)
+
+    # Этап конвейера: сохраняет вычисленные хэши
+    def record_hashes(self, entries):
+        pending = []
+        for entry in entries:
+            if entry.hash != 'N/A':
+                pending.append((entry.hash, entry.filename))
+                if len(pending) >= BATCH:
+                    self.flush()
+                    self.db.executemany("UPDATE files SET hash=? WHERE path=?", pending)
+                    pending = []
+            yield entry
+        self.flush()
+        self.db.executemany("UPDATE files SET hash=? WHERE path=?", pending)
+
+    def flush(self):
+        files, self.files = self.files, []
+        with self.dirs_lock:
+            dirs, self.dirs = self.dirs, []
+        self.db.executemany("INSERT OR REPLACE INTO files (path, parent, ctime, mode, user, size) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", files)
+        self.db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)", dirs)
+
+    # Функция сравнения с прошлым снимком: отдаёт (статус, ctime, mode, user, size, path, hash),
+    # где статус '+' добавлен, '-' удалён, '~' изменён
+    def diff(self, previous_path):
+        self.flush()
+        self.db.commit()
+        self.db.execute("ATTACH DATABASE ? AS old", (previous_path,))
+        try:
+            yield from self.db.execute(
+                "SELECT '+', f.ctime, f.mode, f.user, f.size, f.path, f.hash FROM main.files f "
+                "LEFT JOIN old.files o ON o.path = f.path WHERE o.path IS NULL "
+                "UNION ALL "
+                "SELECT '~', f.ctime, f.mode, f.user, f.size, f.path, f.hash FROM main.files f "
+                "JOIN old.files o ON o.path = f.path "
+                "WHERE f.ctime != o.ctime OR f.mode != o.mode OR f.user != o.user OR f.size != o.size "
+                "OR (f.hash IS NOT NULL AND o.hash IS NOT NULL AND f.hash != o.hash) "
+                "UNION ALL "
+                "SELECT '-', o.ctime, o.mode, o.user, o.size, o.path, o.hash FROM old.files o "
+                "LEFT JOIN main.files f ON f.path = o.path WHERE f.path IS NULL "
+                "ORDER BY 2 DESC")
+        finally:
+            self.db.execute("DETACH DATABASE old")
+
+    def close(self):
+        self.flush()
+        self.db.commit()
+        self.db.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.db.close()
+        os.remove(self.tmp_path)
+
+
+# Прошлый снимок как источник для пропуска неизменившихся каталогов.
+# Индекс каталогов держится в памяти (каталогов на порядки меньше, чем
+# файлов), а записи файлов читаются по запросу через соединение потока.
+class PreviousSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        self.dirs = {row[0]: (row[1], row[2]) for row in db.execute("SELECT path, mtime, ctime FROM dirs")}
+        db.close()
+
+    def _db(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        return db
+
+    # Вызывается walker для каждого каталога: если mtime и ctime каталога
+    # совпадают со снимком, его содержимое берётся из снимка без чтения каталога
+    def reuse_dir(self, path, st):
+        if self.dirs.get(path) != (st.st_mtime_ns, st.st_ctime_ns):
+            return None
+        db = self._db()
+        rows = db.execute("SELECT ctime, mode, user, size, path FROM files WHERE parent=?", (path,))
+        records = [b'%s;%s;%s;%d;%s' % (ctime.encode(), mode.encode(), user, size, fpath)
+                   for ctime, mode, user, size, fpath in rows]
+        subdirs = [row[0] for row in db.execute("SELECT path FROM dirs WHERE parent=? AND path!=?", (path, path))]
+        return records, subdirs
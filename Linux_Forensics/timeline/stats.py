@@ -0,0 +1,123 @@
+# Замеры этапов конвейера (-stats): время (настенное и процессорное),
+# число строк и байт, пиковый RSS после этапа.
+#
+# Конвейер ленивый: этапы-генераторы выполняются вперемешку, поэтому
+# wrap() считает время внутри next() этапа, включая время предыдущего этапа,
+# из которого он читает (inner). Собственное время этапа - разность с inner.
+# Пакетные этапы (разбор в таблицу, отбор, сортировка, вывод) замеряются
+# контекстом timed(). Процессорное время - время процесса, поэтому в него
+# входят и потоки обходчика и хэширования. Замеры на каждую строку стоят
+# около микросекунды, поэтому включаются только с -stats.
+
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+class Stage:
+    def __init__(self, name, inner=None):
+        self.name = name
+        self.inner = inner
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rss = 0
+
+    # Функция собственного времени этапа без времени этапа, из которого он читает
+    def own(self):
+        if self.inner is None:
+            return self.wall, self.cpu
+        return max(0.0, self.wall - self.inner.wall), max(0.0, self.cpu - self.inner.cpu)
+
+    def as_dict(self):
+        wall, cpu = self.own()
+        return {'stage': self.name, 'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6), 'rows': self.rows,
+                'bytes': self.bytes, 'rows_per_s': round(self.rows / wall, 1) if wall else None,
+                'bytes_per_s': round(self.bytes / wall, 1) if wall and self.bytes else None,
+                'peak_rss_kib': self.peak_rss}
+
+
+# Функция пикового RSS процесса в КиБ
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PipelineStats:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.started_wall = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+    def stage(self, name, inner=None):
+        if name not in self.stages:
+            self.stages[name] = Stage(name, self.stages.get(inner))
+        return self.stages[name]
+
+    # Функция замера потокового этапа; size(item) - размер строки в байтах
+    def wrap(self, name, iterable, inner=None, size=None):
+        if not self.enabled:
+            return iterable
+        return self._wrap(self.stage(name, inner), iter(iterable), size)
+
+    def _wrap(self, stage, it, size):
+        perf, cpu = time.perf_counter, time.process_time
+        try:
+            while True:
+                wall_start, cpu_start = perf(), cpu()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    stage.wall += perf() - wall_start
+                    stage.cpu += cpu() - cpu_start
+                stage.rows += 1
+                if size:
+                    stage.bytes += size(item)
+                yield item
+        finally:
+            stage.peak_rss = peak_rss()
+
+    # Контекст замера пакетного этапа; число строк и байт задаются через
+    # возвращаемый объект Stage
+    @contextmanager
+    def timed(self, name, inner=None):
+        if not self.enabled:
+            yield Stage(name)
+            return
+        stage = self.stage(name, inner)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall += time.perf_counter() - wall_start
+            stage.cpu += time.process_time() - cpu_start
+            stage.peak_rss = peak_rss()
+
+    def as_dict(self):
+        return {'stages': [stage.as_dict() for stage in self.stages.values()],
+                'total': {'wall_s': round(time.perf_counter() - self.started_wall, 6),
+                          'cpu_s': round(time.process_time() - self.started_cpu, 6), 'peak_rss_kib': peak_rss()}}
+
+    # Функция вывода таблицы этапов
+    def report(self, file=None):
+        file = file or sys.stderr
+        print(f"{'stage':<8}{'wall s':>10}{'cpu s':>10}{'rows':>12}{'rows/s':>12}{'MB/s':>10}{'peak RSS MiB':>14}",
+              file=file)
+        for row in self.as_dict()['stages']:
+            mbps = row['bytes_per_s'] / 1e6 if row['bytes_per_s'] else 0
+            print(f"{row['stage']:<8}{row['wall_s']:>10.3f}{row['cpu_s']:>10.3f}{row['rows']:>12}"
+                  f"{row['rows_per_s'] or 0:>12.0f}{mbps:>10.1f}{row['peak_rss_kib'] / 1024:>14.1f}", file=file)
+        total = self.as_dict()['total']
+        print(f"{'total':<8}{total['wall_s']:>10.3f}{total['cpu_s']:>10.3f}{'':>34}{total['peak_rss_kib'] / 1024:>14.1f}",
+              file=file)
+
+    # Функция записи профиля в JSON; extra - сведения о запуске (аргументы, хост)
+    def write_json(self, path, extra=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(extra or {}, **self.as_dict()), f, ensure_ascii=False, indent=2)
+            f.write('\n')
@@ -0,0 +1,58 @@
+# Время создания файла (birth time) через statx(2).
+# os.stat в Linux не возвращает время создания, поэтому statx вызывается
+# из libc через ctypes. Если libc без statx или файловая система не хранит
+# время создания, birth_time_ns() возвращает None.
+
+import ctypes
+import os
+import threading
+
+AT_FDCWD = -100
+AT_SYMLINK_NOFOLLOW = 0x100
+STATX_BTIME = 0x800
+
+
+class _Timestamp(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_int64), ('tv_nsec', ctypes.c_uint32), ('reserved', ctypes.c_int32)]
+
+
+# struct statx из linux/stat.h (256 байт)
+class _Statx(ctypes.Structure):
+    _fields_ = [('stx_mask', ctypes.c_uint32), ('stx_blksize', ctypes.c_uint32), ('stx_attributes', ctypes.c_uint64),
+                ('stx_nlink', ctypes.c_uint32), ('stx_uid', ctypes.c_uint32), ('stx_gid', ctypes.c_uint32),
+                ('stx_mode', ctypes.c_uint16), ('spare0', ctypes.c_uint16), ('stx_ino', ctypes.c_uint64),
+                ('stx_size', ctypes.c_uint64), ('stx_blocks', ctypes.c_uint64),
+                ('stx_attributes_mask', ctypes.c_uint64), ('stx_atime', _Timestamp), ('stx_btime', _Timestamp),
+                ('stx_ctime', _Timestamp), ('stx_mtime', _Timestamp), ('stx_rdev_major', ctypes.c_uint32),
+                ('stx_rdev_minor', ctypes.c_uint32), ('stx_dev_major', ctypes.c_uint32),
+                ('stx_dev_minor', ctypes.c_uint32), ('spare2', ctypes.c_uint64 * 14)]
+
+
+# Функция загрузки statx из libc; None, если её нет
+def _load():
+    try:
+        func = ctypes.CDLL(None, use_errno=True).statx
+    except (AttributeError, OSError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx)]
+    func.restype = ctypes.c_int
+    return func
+
+
+_statx = _load()
+# Буфер на поток: обходчик вызывает statx из нескольких потоков (ctypes отпускает GIL)
+_local = threading.local()
+
+
+# Функция получения времени создания файла в наносекундах (без перехода по ссылкам)
+def birth_time_ns(path):
+    if _statx is None:
+        return None
+    buf = getattr(_local, 'buf', None)
+    if buf is None:
+        buf = _local.buf = _Statx()
+    if _statx(AT_FDCWD, os.fsencode(path), AT_SYMLINK_NOFOLLOW, STATX_BTIME, ctypes.byref(buf)) != 0:
+        return None
+    if not buf.stx_mask & STATX_BTIME:
+        return None
+    return buf.stx_btime.tv_sec * 1000000000 + buf.stx_btime.tv_nsec
@@ -0,0 +1,168 @@
+# Табличное представление временной шкалы.
+# Записи хранятся по столбцам в array.array (время в нс, размер, права,
+# индекс пользователя) плюс список путей и словарь пользователей, без
+# namedtuple на каждую строку. Фильтрация строится из масок по столбцам,
+# сортировка - argsort по столбцу времени; при наличии numpy обе операции
+# векторизуются, без него выполняются через map/compress на уровне C.
+# Объекты TimelineEntry создаются только для строк, уходящих в вывод.
+# Пути хранятся в байтах, как их выдал сборщик, и декодируются при выводе.
+
+import gc
+import operator
+from array import array
+from collections import namedtuple
+from functools import reduce
+from itertools import compress, islice
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Определение структуры данных временной шкалы
+TimelineEntry = namedtuple('TimelineEntry', ['timestamp', 'user', 'permissions', 'size', 'filename', 'hash',
+                                             'timestamp_ns', 'host', 'macb', 'status', 'score', 'reasons'],
+                           defaults=['N/A', 0, '', '', '', 0, ''])
+
+NS = 1000000000
+SPLIT = operator.methodcaller('split', b';', 4)
+DROP_LAST = operator.itemgetter(slice(None, -1))
+DROP_DOT = operator.methodcaller('replace', b'.', b'')
+USER = operator.itemgetter(2)
+
+
+# Функция декодирования имени пользователя из записи; байты не в UTF-8
+# выводятся как \xNN
+def decode_user(name):
+    return name.decode('utf-8', 'backslashreplace')
+
+
+class TimelineTable:
+    def __init__(self):
+        self.timestamp_ns = array('q')
+        self.size = array('q')
+        self.mode = array('H')
+        self.user_id = array('I')
+        self.paths = []
+        self.users = []
+        self._user_ids = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    # Функция заполнения таблицы из записей (bytes) формата %C@;%y%m;%u;%s;%p.
+    # Строки обрабатываются пачками: каждая разбивается один раз, пачка
+    # транспонируется в столбцы через zip, а преобразования столбцов идут
+    # через map на уровне C. %C@ у find (и у встроенного walker) всегда
+    # содержит 10 знаков после точки, последний отбрасывается до наносекунд.
+    # Сборщик циклического мусора на время разбора отключается: пачки
+    # порождают миллионы списков и кортежей без циклов, а его проходы по ним
+    # занимали больше времени, чем сам разбор.
+    # Если задан user, строки других пользователей отбрасываются сразу после
+    # разбиения, до преобразования остальных столбцов.
+    @classmethod
+    def from_lines(cls, lines, user=None, batch=65536):
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return cls._from_lines(lines, user, batch)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    @classmethod
+    def _from_lines(cls, lines, user, batch):
+        table = cls()
+        lines = iter(lines)
+        modes = {}
+        # Идентификаторы пользователей по байтам имени из записи
+        user_ids = {}
+        user_key = user.encode('utf-8', 'surrogateescape') if user else None
+        while rows := list(map(SPLIT, islice(lines, batch))):
+            if user:
+                rows = list(compress(rows, map(user_key.__eq__, map(USER, rows))))
+                if not rows:
+                    continue
+            ts, perms, users, sizes, paths = zip(*rows)
+            table.timestamp_ns.extend(map(int, map(DROP_DOT, map(DROP_LAST, ts))))
+            table.size.extend(map(int, sizes))
+            for perm in set(perms).difference(modes):
+                modes[perm] = int(perm.lstrip(b'f') or b'0', 8)
+            table.mode.extend(map(modes.__getitem__, perms))
+            for name in set(users).difference(user_ids):
+                user_ids[name] = len(table.users)
+                table.users.append(decode_user(name))
+                table._user_ids.setdefault(table.users[-1], user_ids[name])
+            table.user_id.extend(map(user_ids.__getitem__, users))
+            table.paths.extend(paths)
+        return table
+
+    # Функция отбора строк по пользователю, временным рамкам (в секундах, как
+    # -start-date/-end-date) и принадлежности пакетам. Возвращает индексы строк.
+    def filter(self, user=None, start_ts=None, end_ts=None, packages=None):
+        count = len(self)
+        if not count:
+            return array('q')
+        if user and user not in self._user_ids:
+            return array('q')
+        uid = self._user_ids[user] if user else None
+        start_ns = start_ts * NS if start_ts else None
+        # Запись с ts (в секундах) <= end_ts проходит, т.е. ts_ns < (end_ts + 1) * NS
+        end_ns = (end_ts + 1) * NS - 1 if end_ts else None
+
+        if numpy is not None:
+            mask = numpy.ones(count, dtype=bool)
+            ts = numpy.frombuffer(self.timestamp_ns, dtype=numpy.int64)
+            if uid is not None:
+                mask &= numpy.frombuffer(self.user_id, dtype=numpy.uint32) == uid
+            if start_ns is not None:
+                mask &= ts >= start_ns
+            if end_ns is not None:
+                mask &= ts <= end_ns
+            if packages:
+                mask &= ~numpy.fromiter(map(packages.__contains__, self.paths), dtype=bool, count=count)
+            return numpy.flatnonzero(mask)
+
+        masks = []
+        if uid is not None:
+            masks.append(map(uid.__eq__, self.user_id))
+        if start_ns is not None:
+            masks.append(map(start_ns.__le__, self.timestamp_ns))
+        if end_ns is not None:
+            masks.append(map(end_ns.__ge__, self.timestamp_ns))
+        if packages:
+            masks.append(map(operator.not_, map(packages.__contains__, self.paths)))
+        if not masks:
+            return array('q', range(count))
+        return array('q', compress(range(count), reduce(lambda a, b: map(operator.and_, a, b), masks)))
+
+    # Функция сортировки индексов по времени изменения (по умолчанию от новых к старым)
+    def argsort(self, indices, reverse=True):
+        if numpy is not None and len(indices):
+            indices = numpy.asarray(indices)
+            ts = numpy.frombuffer(self.timestamp_ns, dtype=numpy.int64)[indices]
+            return indices[numpy.argsort(-ts if reverse else ts, kind='stable')]
+        return sorted(indices, key=self.timestamp_ns.__getitem__, reverse=reverse)
+
+    # Функция копирования выбранных строк (в заданном порядке) в новую таблицу,
+    # например чтобы передать результат отбора из процесса-обработчика
+    def take(self, indices):
+        table = TimelineTable()
+        table.timestamp_ns = array('q', map(self.timestamp_ns.__getitem__, indices))
+        table.size = array('q', map(self.size.__getitem__, indices))
+        table.mode = array('H', map(self.mode.__getitem__, indices))
+        table.user_id = array('I', map(self.user_id.__getitem__, indices))
+        table.paths = list(map(self.paths.__getitem__, indices))
+        table.users = list(self.users)
+        table._user_ids = dict(self._user_ids)
+        return table
+
+    # Функция получения записей TimelineEntry для выбранных строк; host
+    # заполняет столбец хоста при анализе нескольких листингов
+    def entries(self, indices, host=''):
+        ts, size, mode, user_id, paths, users = (self.timestamp_ns, self.size, self.mode, self.user_id,
+                                                 self.paths, self.users)
+        for i in indices:
+            ns = ts[i]
+            yield TimelineEntry(ns // NS, users[user_id[i]], format(mode[i], 'o'), str(size[i]), paths[i], 'N/A', ns,
+                                host)
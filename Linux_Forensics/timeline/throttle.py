@@ -0,0 +1,170 @@
+# Ограничение нагрузки при сканировании рабочих серверов (-throttle).
+#
+# Процесс (и запущенный им find) переводится в класс ввода-вывода idle и
+# nice 19: диск и процессор достаются ему, только когда они не нужны
+# остальным. Сверх этого Throttle ограничивает темп работы:
+#   - iops: операций в секунду (stat файла или каталога при обходе, stat и
+#     блок чтения при хэшировании);
+#   - bps: байт чтения в секунду при хэшировании;
+#   - cpu: долю процессорного времени процесса (всех потоков) от настенного;
+# и приостанавливает работу, пока средняя загрузка на ядро выше max_load или
+# очередь запросов к диску, на котором лежит корень, длиннее max_queue.
+# Темп выдерживается по виртуальным часам: каждая операция сдвигает их на
+# свою стоимость, а вызывающий ждёт, пока реальное время их не догонит.
+# Запас часов не больше секунды, поэтому после паузы нет всплеска.
+
+import ctypes
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# Номера системного вызова ioprio_set по архитектурам
+IOPRIO_SET = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'riscv64': 30, 'armv7l': 314,
+              'ppc64le': 273, 's390x': 282}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+# Период проверки загрузки, очереди диска и доли процессора, с
+CHECK_INTERVAL = 0.5
+PAUSE_STEP = 1.0
+# Сам обход держит в работе около одного потока, это не считается чужой загрузкой
+OWN_LOAD = 1.0
+
+
+# Функция перевода процесса в класс ввода-вывода idle и nice 19. В Linux
+# приоритеты относятся к потоку и наследуются новыми потоками и дочерними
+# процессами, поэтому функция вызывается до запуска пулов потоков и find.
+# Возвращает список понижений, которые удалось выполнить.
+def lower_priority():
+    lowered = []
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, 19)
+        lowered.append('nice 19')
+    except OSError:
+        pass
+    number = IOPRIO_SET.get(platform.machine())
+    if number is not None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0:
+            lowered.append('ionice idle')
+    elif shutil.which('ionice'):
+        if subprocess.run(['ionice', '-c', '3', '-p', str(os.getpid())], stderr=subprocess.DEVNULL).returncode == 0:
+            lowered.append('ionice idle')
+    return lowered
+
+
+# Функция выбора строк /proc/diskstats для диска с корнем обхода: по номеру
+# устройства (у разделов и dm своя строка), а если его там нет (overlay,
+# tmpfs) - все диски, кроме loop и ram. None, если статистика недоступна.
+def disk_names(root):
+    try:
+        st = os.stat(root)
+        with open('/proc/diskstats') as f:
+            rows = [line.split() for line in f]
+    except OSError:
+        return None
+    major, minor = os.major(st.st_dev), os.minor(st.st_dev)
+    names = {row[2] for row in rows if int(row[0]) == major and int(row[1]) == minor}
+    return names or {row[2] for row in rows if not row[2].startswith(('loop', 'ram', 'zram'))}
+
+
+# Функция длины очереди диска: запросы в обработке (12-й столбец /proc/diskstats),
+# наибольшее значение по выбранным устройствам
+def disk_queue(names):
+    queue = 0
+    with open('/proc/diskstats') as f:
+        for line in f:
+            row = line.split()
+            if row[2] in names:
+                queue = max(queue, int(row[11]))
+    return queue
+
+
+class Throttle:
+    # iops, bps - бюджеты операций и байт в секунду; cpu - доля процессора (0..1];
+    # max_load - загрузка на ядро, max_queue - длина очереди диска. None или 0 -
+    # без ограничения. root - корень обхода для выбора диска, log - поток сообщений.
+    def __init__(self, iops=None, bps=None, cpu=None, max_load=None, max_queue=None, root='/', log=None):
+        self.iops = iops
+        self.bps = bps
+        self.cpu = cpu
+        self.max_load = max_load
+        self.max_queue = max_queue
+        self.disks = disk_names(root) if max_queue else None
+        self.cpus = os.cpu_count() or 1
+        self.log = log or sys.stderr
+        self.lock = threading.Lock()
+        self.started = self.ops_clock = self.bytes_clock = time.monotonic()
+        self.cpu_started = time.process_time()
+        self.next_check = 0.0
+        self.waited = 0.0
+        self.paused = 0.0
+        self.stopped = False
+
+    # Функция учёта ops операций и nbytes прочитанных байт; вызывается из любых
+    # потоков. При превышении бюджета вызывающий поток ждёт, а при перегрузке
+    # системы ждут все потоки.
+    def consume(self, ops=1, nbytes=0):
+        if self.stopped:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now >= self.next_check:
+                self._check(now)
+                now = time.monotonic()
+                self.next_check = now + CHECK_INTERVAL
+            wait = 0.0
+            if self.iops:
+                self.ops_clock = max(self.ops_clock, now - 1.0) + ops / self.iops
+                wait = self.ops_clock - now
+            if self.bps and nbytes:
+                self.bytes_clock = max(self.bytes_clock, now - 1.0) + nbytes / self.bps
+                wait = max(wait, self.bytes_clock - now)
+            if wait > 0:
+                self.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    # Функция проверки доли процессора и перегрузки системы (под блокировкой)
+    def _check(self, now):
+        if self.cpu:
+            wall = now - self.started
+            used = time.process_time() - self.cpu_started
+            if used > self.cpu * wall:
+                delay = used / self.cpu - wall
+                self.waited += delay
+                time.sleep(delay)
+        reason = self._overload()
+        if not reason:
+            return
+        print(f"Throttle: pausing, {reason}", file=self.log)
+        started = time.monotonic()
+        while reason and not self.stopped:
+            time.sleep(PAUSE_STEP)
+            reason = self._overload()
+        paused = time.monotonic() - started
+        self.paused += paused
+        print(f"Throttle: resumed after {paused:.0f}s", file=self.log)
+
+    # Функция причины паузы: текст или None, если система не перегружена
+    def _overload(self):
+        if self.max_load:
+            load = max(0.0, os.getloadavg()[0] - OWN_LOAD) / self.cpus
+            if load > self.max_load:
+                return f"load average {load:.2f} per CPU > {self.max_load}"
+        if self.disks:
+            queue = disk_queue(self.disks)
+            if queue > self.max_queue:
+                return f"disk queue {queue} > {self.max_queue}"
+        return None
+
+    # Функция остановки: ожидания и паузы больше не выполняются (при прерывании)
+    def stop(self):
+        self.stopped = True
+
+    def summary(self):
+        return f"Throttle: waited {self.waited:.1f}s for the budget, paused {self.paused:.1f}s for system load"
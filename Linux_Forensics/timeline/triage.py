@@ -0,0 +1,217 @@
+# Оценка подозрительности файлов (-triage N).
+#
+# Правила один раз компилируются в индекс:
+#   - по правам: таблица на все 4096 значений %m (SUID, SGID, запись для
+#     всех) - оценка прав становится одним обращением по индексу;
+#   - по пути: словарь по первому компоненту пути (tmp, dev, usr, ...) со
+#     списком правил для префиксов внутри него - исполняемые файлы во
+#     временных каталогах и владельцы системных каталогов;
+#   - файлы внутри скрытых каталогов (кроме обычных .cache, .git и т.п.)
+#     и владельцы без записи в passwd (имя - число);
+#   - IOC: хэши (отдельное множество на алгоритм) и размеры из файла -ioc.
+#     Если у хэша указан размер, файл с таким размером хэшируется здесь же
+#     его алгоритмом, когда -hash не задан или посчитан другим алгоритмом.
+# Из записей с ненулевой оценкой куча размера N оставляет N самых
+# подозрительных, полная сортировка не нужна.
+
+import heapq
+import os
+
+# Оценки признаков
+SCORES = {
+    'suid': 40,
+    'sgid': 25,
+    'world-writable': 20,
+    'exec-in-tmp': 35,
+    'hidden-dir': 15,
+    'hidden-dir-in-tmp': 30,
+    'owner': 25,
+    'unknown-owner': 20,
+    'ioc-hash': 100,
+    'ioc-size': 10,
+}
+# Каталоги для временных файлов: исполняемые файлы в них - частый след атаки
+TMP_DIRS = [b'/tmp/', b'/var/tmp/', b'/dev/shm/', b'/run/shm/']
+# Системные каталоги и допустимые владельцы файлов в них
+OWNED_DIRS = {
+    b'/bin/': {'root'},
+    b'/sbin/': {'root'},
+    b'/lib/': {'root'},
+    b'/lib64/': {'root'},
+    b'/usr/': {'root'},
+    b'/boot/': {'root'},
+    b'/etc/': {'root'},
+}
+# Алгоритм хэша по длине hex-строки
+ALGORITHMS = {32: 'md5', 64: 'sha256'}
+# Скрытые каталоги, обычные для домашних каталогов и проектов
+BENIGN_HIDDEN = {b'.cache', b'.config', b'.local', b'.git', b'.npm', b'.cargo', b'.rustup', b'.mozilla', b'.pyenv',
+                 b'.venv', b'.vscode-server', b'.gnupg', b'.java', b'.m2', b'.gradle'}
+
+
+# Функция чтения IOC: по строке на индикатор, # - комментарий.
+#   <md5 или sha256>           хэш
+#   <md5 или sha256> <размер>  хэш с размером (для хэширования кандидатов)
+#   size:<размер>              размер файла
+# Возвращает (алгоритм -> множество хэшей, размер -> множество алгоритмов, размеры)
+def load_iocs(path):
+    hashes = {}
+    hash_sizes = {}
+    sizes = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('size:'):
+                sizes.add(int(line[5:]))
+                continue
+            fields = line.split()
+            digest = fields[0].lower()
+            algorithm = ALGORITHMS.get(len(digest))
+            if algorithm is None:
+                raise ValueError(f"{path}: unknown indicator {line!r}")
+            hashes.setdefault(algorithm, set()).add(digest)
+            if len(fields) > 1:
+                hash_sizes.setdefault(int(fields[1]), set()).add(algorithm)
+    return hashes, hash_sizes, sizes
+
+
+# Функция оценки прав: (оценка, признаки) для значения %m
+def _mode_rule(mode):
+    reasons = []
+    if mode & 0o4000:
+        reasons.append('suid')
+    if mode & 0o2000:
+        reasons.append('sgid')
+    if mode & 0o002:
+        reasons.append('world-writable')
+    return sum(SCORES[r] for r in reasons), tuple(reasons)
+
+
+class TriageRules:
+    # root - корень обхода: при сканировании образа он отрезается от путей
+    # перед сравнением с префиксами; iocs - результат load_iocs()
+    def __init__(self, root='/', iocs=None):
+        self.strip = len(os.fsencode(root.rstrip('/')))
+        self.modes = [_mode_rule(mode) for mode in range(0o10000)]
+        self.perms = {}
+        # Индекс префиксов: первый компонент пути -> [(префикс, вид, параметр)]
+        self.prefixes = {}
+        for prefix in TMP_DIRS:
+            self._add_prefix(prefix, 'tmp', None)
+        for prefix, owners in OWNED_DIRS.items():
+            self._add_prefix(prefix, 'owner', owners)
+        self.hashes, self.hash_sizes, self.sizes = iocs or ({}, {}, set())
+        self.ioc_hashed = 0
+
+    def _add_prefix(self, prefix, kind, param):
+        top = prefix[1:prefix.index(b'/', 1)]
+        self.prefixes.setdefault(top, []).append((prefix, kind, param))
+
+    # Функция кода прав из поля %m (строка вида '4755'); кэшируется по значению
+    def _perm(self, perm):
+        rule = self.perms.get(perm)
+        if rule is None:
+            try:
+                mode = int(perm.lstrip('f') or '0', 8) & 0o7777
+            except ValueError:
+                mode = 0
+            rule = self.perms[perm] = (mode,) + self.modes[mode]
+        return rule
+
+    # Функция оценки записи: (оценка, признаки)
+    def score(self, entry):
+        mode, score, reasons = self._perm(entry.permissions)
+        path = entry.filename if isinstance(entry.filename, bytes) else os.fsencode(entry.filename)
+        if self.strip:
+            path = path[self.strip:]
+        slash = path.find(b'/', 1)
+        rules = self.prefixes.get(path[1:slash]) if slash > 0 else None
+        in_tmp = False
+        if rules:
+            for prefix, kind, param in rules:
+                if not path.startswith(prefix):
+                    continue
+                if kind == 'tmp':
+                    in_tmp = True
+                    if mode & 0o111:
+                        score += SCORES['exec-in-tmp']
+                        reasons += ('exec-in-tmp',)
+                elif entry.user not in param:
+                    score += SCORES['owner']
+                    reasons += ('owner',)
+
+        # Скрытый каталог: компонент каталога, начинающийся с точки
+        name_start = path.rfind(b'/')
+        start = path.find(b'/.', 0, name_start)
+        while start != -1:
+            end = path.find(b'/', start + 1)
+            if path[start + 1:end] not in BENIGN_HIDDEN:
+                reason = 'hidden-dir-in-tmp' if in_tmp else 'hidden-dir'
+                score += SCORES[reason]
+                reasons += (reason,)
+                break
+            start = path.find(b'/.', end, name_start)
+
+        if entry.user.isdigit():
+            score += SCORES['unknown-owner']
+            reasons += ('unknown-owner',)
+
+        if self.hashes or self.sizes:
+            size = int(entry.size)
+            if size in self.sizes:
+                score += SCORES['ioc-size']
+                reasons += ('ioc-size',)
+            if self._ioc_hash(entry, size):
+                score += SCORES['ioc-hash']
+                reasons += ('ioc-hash',)
+        return score, reasons
+
+    # Функция сверки хэша с IOC: готовый хэш (-hash) сверяется с хэшами того же
+    # алгоритма, а файл, размер которого совпадает с размером хэша из IOC
+    # другого алгоритма, хэшируется этим алгоритмом
+    def _ioc_hash(self, entry, size):
+        computed = ALGORITHMS.get(len(entry.hash)) if entry.hash != 'N/A' else None
+        if computed and entry.hash in self.hashes.get(computed, ()):
+            return True
+        algorithms = self.hash_sizes.get(size)
+        if not algorithms:
+            return False
+        from timeline.hashing import hash_file
+        for algorithm in algorithms:
+            if algorithm == computed:
+                continue
+            self.ioc_hashed += 1
+            if hash_file(entry.filename, algorithm) in self.hashes[algorithm]:
+                return True
+        return False
+
+
+# Функция оценки потока записей: отдаёт top самых подозрительных записей с
+# заполненными score и reasons, от высшей оценки к низшей (при равенстве -
+# от новых к старым). В stats записываются число оценённых и отмеченных записей.
+def triage_timeline(entries, rules, top, stats=None):
+    stats = {} if stats is None else stats
+    heap = []
+    scored = flagged = 0
+    previous = None
+    for seq, entry in enumerate(entries):
+        # События -macb одного файла идут подряд: оценивается файл, а не каждое
+        # событие, в выборку попадает его последнее событие
+        if entry.filename == previous:
+            continue
+        previous = entry.filename
+        scored += 1
+        score, reasons = rules.score(entry)
+        if not score:
+            continue
+        flagged += 1
+        item = (score, entry.timestamp_ns or entry.timestamp, -seq, entry, reasons)
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, item)
+    stats.update(scored=scored, flagged=flagged, hashed=rules.ioc_hashed)
+    for score, _, _, entry, reasons in sorted(heap, key=lambda item: item[:3], reverse=True):
+        yield entry._replace(score=score, reasons=','.join(reasons))
@@ -0,0 +1,156 @@
+# Проверка целостности файлов пакетов по /var/lib/dpkg/info/*.md5sums
+# и Conffiles из /var/lib/dpkg/status (замена последовательного `dpkg --verify`).
+#
+# Файл, чей ctime не новее времени установки пакета (mtime его .list),
+# не менялся после установки: ctime нельзя откатить без
+# подмены системных часов. Такие файлы не хэшируются, остальные
+# проверяются в пуле потоков. Conffiles (их нет в md5sums) хэшируются
+# всегда: их меняют администраторы, и время установки для них не показательно.
+# Остальные пути из .list (каталоги, символьные ссылки) проверяются на
+# существование, как отсутствующие в `dpkg --verify`.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from timeline.hashing import hash_file
+from timeline.packages import DPKG_INFO, DPKG_STATUS
+
+DPKG_DIVERSIONS = '/var/lib/dpkg/diversions'
+
+
+# Функция времени установки пакета, ns: mtime .list, который dpkg пишет при
+# распаковке. mtime .md5sums для этого не годится: dpkg сохраняет время из
+# архива пакета, то есть дату сборки, и ctime любого распакованного файла
+# оказался бы новее, а хэшировать пришлось бы всё. Цена: dpkg переписывает .list
+# и при переустановке пакета без изменения версии, поэтому изменение, сделанное
+# до такой перезаписи, пропускается без -verify-all. 0 (хэшировать всё), если
+# .list нет.
+def _installed_time(name):
+    try:
+        return os.stat(os.path.join(DPKG_INFO, name + '.list')).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# Функция чтения md5sums одного пакета: [(путь, md5, время установки ns)]
+def _read_md5sums(name):
+    installed = _installed_time(name)
+    try:
+        with open(os.path.join(DPKG_INFO, name + '.md5sums'), 'rb') as f:
+            lines = f.read().decode('utf-8', errors='replace').splitlines()
+    except OSError:
+        return []
+    result = []
+    for line in lines:
+        md5, sep, path = line.partition('  ')
+        if sep:
+            result.append(('/' + path, md5, installed))
+    return result
+
+
+# Функция чтения списка путей одного пакета из .list
+def _read_list(name):
+    try:
+        with open(os.path.join(DPKG_INFO, name + '.list'), 'rb') as f:
+            return [line.decode('utf-8', errors='replace') for line in f.read().splitlines()]
+    except OSError:
+        return []
+
+
+# Функция чтения Conffiles установленных пакетов из status: [(путь, md5)].
+# Устаревшие (obsolete) conffiles и ещё не установленные (newconffile) пропускаются.
+def _read_conffiles(status=DPKG_STATUS):
+    result = []
+    installed = False
+    in_conffiles = False
+    with open(status, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith(' ') and in_conffiles:
+                fields = line.split()
+                if installed and len(fields) >= 2 and len(fields[1]) == 32 and 'obsolete' not in fields[2:]:
+                    result.append((fields[0], fields[1]))
+                continue
+            in_conffiles = line.startswith('Conffiles:')
+            if line.startswith('Status:'):
+                installed = line.split()[-1] == 'installed'
+            elif not line.strip():
+                installed = False
+    return result
+
+
+# Функция чтения отклонений dpkg-divert: путь -> (новый путь, пакет)
+def _read_diversions(path=DPKG_DIVERSIONS):
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    return {lines[i]: (lines[i + 1], lines[i + 2]) for i in range(0, len(lines) - 2, 3)}
+
+
+# Функция поиска отсутствующих путей пакета, которых нет в md5sums
+# (каталоги, символьные ссылки); пути, отклонённые другим пакетом, ищутся
+# по новому месту
+def _missing_paths(name, skip, diversions):
+    package = name.split(':')[0]
+    missing = []
+    for path in _read_list(name):
+        if path in skip or path == '/.':
+            continue
+        diverted = diversions.get(path)
+        if diverted and diverted[1] != package:
+            path = diverted[0]
+        if not os.path.lexists(path):
+            missing.append(path)
+    return missing
+
+
+# Функция проверки одного файла: None если файл цел, иначе 'modified', 'missing' или 'unreadable'
+def _verify_file(path, md5, installed, check_all):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 'missing'
+    except OSError:
+        return 'unreadable'
+    if not check_all and st.st_ctime_ns <= installed:
+        return None
+    digest = hash_file(path, 'md5')
+    if digest is None:
+        return 'unreadable'
+    return 'modified' if digest != md5 else None
+
+
+# Функция проверки всех пакетов. Возвращает словарь множеств
+# modified/conffiles (изменённые conffiles)/missing/unreadable и заполняет
+# stats счётчиками.
+def verify_packages(workers=None, check_all=False, stats=None):
+    if stats is None:
+        stats = {}
+    names = sorted(fn[:-len('.md5sums')] for fn in os.listdir(DPKG_INFO) if fn.endswith('.md5sums'))
+    list_names = sorted(fn[:-len('.list')] for fn in os.listdir(DPKG_INFO) if fn.endswith('.list'))
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    result = {'modified': set(), 'conffiles': set(), 'missing': set(), 'unreadable': set()}
+    try:
+        conffiles = _read_conffiles()
+    except OSError:
+        conffiles = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        files = [item for items in pool.map(_read_md5sums, names) for item in items]
+        stats['files'] = len(files) + len(conffiles)
+        statuses = pool.map(_verify_file, *zip(*files), [check_all] * len(files)) if files else []
+        for (path, _, _), status in zip(files, statuses):
+            if status:
+                result[status].add(path)
+        statuses = pool.map(_verify_file, *zip(*conffiles), [0] * len(conffiles), [True] * len(conffiles)) \
+            if conffiles else []
+        for (path, _), status in zip(conffiles, statuses):
+            if status:
+                result['conffiles' if status == 'modified' else status].add(path)
+
+        skip = {path for path, _, _ in files} | {path for path, _ in conffiles}
+        diversions = _read_diversions()
+        for missing in pool.map(_missing_paths, list_names, [skip] * len(list_names),
+                                [diversions] * len(list_names)):
+            result['missing'].update(missing)
+    return result
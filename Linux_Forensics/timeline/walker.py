@@ -0,0 +1,167 @@
+# Встроенный обходчик файловой системы на os.scandir + пул потоков.
+# Выдаёт те же записи, что и find -printf "%C@;%y%m;%u;%s;%p\0" (bytes),
+# поэтому остальной конвейер не зависит от выбранного бэкенда. Каталоги
+# читаются по путям в байтах: имена не декодируются, а для исключений
+# путь декодируется через os.fsdecode только при заданных шаблонах.
+
+import os
+import pwd
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+
+from timeline.exclude import ExcludeMatcher
+
+
+# Функция получения имени пользователя по uid (как %u у find)
+def user_name(uid, cache):
+    name = cache.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        cache[uid] = name
+    return name
+
+
+# Функция получения имени пользователя по заданной таблице (например, /etc/passwd
+# смонтированного образа); неизвестные uid выводятся числом
+def mapped_user_name(uid, users):
+    return users.get(uid) or str(uid)
+
+
+# Функция имени пользователя в байтах для записей; cache - uid -> bytes,
+# users - таблица образа или None (имена из pwd)
+def _record_user(uid, cache, users=None):
+    name = cache.get(uid)
+    if name is None:
+        name = cache[uid] = os.fsencode(user_name(uid, {}) if users is None else mapped_user_name(uid, users))
+    return name
+
+
+# Функция формирования записи файла в формате %C@;%y%m;%u;%s;%p
+def _ctime_record(full, st, user_name):
+    ns = st.st_ctime_ns
+    return b"%d.%09d0;f%o;%b;%d;%b" % (ns // 1000000000, ns % 1000000000, st.st_mode & 0o7777,
+                                      user_name(st.st_uid), st.st_size, full)
+
+
+# Функция формирования записи файла в формате %A@;%T@;%C@;%B@;%y%m;%u;%s;%p
+# (-macb); время создания берётся через statx, неизвестное выводится как "-"
+def _macb_record(full, st, user_name, birth_time):
+    birth = birth_time(full)
+    times = [st.st_atime_ns, st.st_mtime_ns, st.st_ctime_ns]
+    fields = [b"%d.%09d0" % (ns // 1000000000, ns % 1000000000) for ns in times]
+    fields.append(b'-' if birth is None else b"%d.%09d0" % (birth // 1000000000, birth % 1000000000))
+    return b"%b;f%o;%b;%d;%b" % (b';'.join(fields), st.st_mode & 0o7777, user_name(st.st_uid), st.st_size, full)
+
+
+# Функция выбора подкаталога для обхода с учётом -xdev и исключений
+def _want_dir(path, st, root_dev, exclude):
+    # -xdev: не спускаемся в другие файловые системы
+    if root_dev is not None and st.st_dev != root_dev:
+        return False
+    return not (exclude and exclude.prunes(os.fsdecode(path)))
+
+
+# Функция сканирования одного каталога: возвращает строки для файлов, список
+# подкаталогов (путь, stat), число ошибок и число операций ввода-вывода
+# (scandir и stat). on_dir получает каждый просканированный каталог,
+# а reuse может вернуть готовое содержимое каталога вместо его чтения.
+def _scan_dir(path, dir_st, root_dev, exclude, record, on_dir, reuse):
+    records = []
+    subdirs = []
+    errors = 0
+    ops = 1
+    if on_dir:
+        on_dir(path, dir_st)
+    cached = reuse(path, dir_st) if reuse else None
+    if cached:
+        records, known_subdirs = cached
+        for sub in known_subdirs:
+            try:
+                st = os.lstat(sub)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode) and _want_dir(sub, st, root_dev, exclude):
+                subdirs.append((sub, st))
+        return records, subdirs, errors, len(known_subdirs)
+
+    prefix = path if path.endswith(b'/') else path + b'/'
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                ops += 1
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    errors += 1
+                    continue
+                full = prefix + entry.name
+                if stat.S_ISDIR(st.st_mode):
+                    if _want_dir(full, st, root_dev, exclude):
+                        subdirs.append((full, st))
+                elif stat.S_ISREG(st.st_mode):
+                    if exclude and exclude.excludes(os.fsdecode(full)):
+                        continue
+                    records.append(record(full, st))
+    except OSError:
+        errors += 1
+    return records, subdirs, errors, ops
+
+
+# Функция параллельного обхода дерева каталогов.
+# exclude - ExcludeMatcher или список шаблонов; исключённые поддеревья не читаются.
+# Каталоги раздаются пулу потоков по одному; очередь ожидающих каталогов
+# обрабатывается в глубину, а число задач в полёте ограничено, поэтому
+# память не растёт вместе с размером дерева.
+# users - словарь uid -> имя для обхода образов; без него имена берутся из pwd.
+# Пути (в записях, on_dir и reuse) - bytes.
+# macb - выводить строки с временами доступа, изменения, inode и создания.
+# done(path, records, subdirs) вызывается в потоке генератора для каждого
+# прочитанного каталога; throttle - timeline.throttle.Throttle: новые каталоги
+# раздаются, только пока операции чтения укладываются в его бюджет.
+def walk_tree(root='/', exclude=None, xdev=True, workers=None, counters=None, on_dir=None, reuse=None, users=None,
+              macb=False, done=None, throttle=None):
+    if counters is None:
+        counters = {}
+    counters.setdefault('errors', 0)
+    if not isinstance(exclude, ExcludeMatcher):
+        exclude = ExcludeMatcher(exclude or [])
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    record_user = partial(_record_user, cache={}, users=users)
+    if macb:
+        from timeline.statx import birth_time_ns
+        record = partial(_macb_record, user_name=record_user, birth_time=birth_time_ns)
+    else:
+        record = partial(_ctime_record, user_name=record_user)
+
+    root = os.fsencode(root)
+    try:
+        root_st = os.lstat(root)
+    except OSError:
+        counters['errors'] += 1
+        return
+    root_dev = root_st.st_dev if xdev else None
+
+    pending = deque([(root, root_st)])
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or in_flight:
+            while pending and len(in_flight) < workers * 2:
+                path, st = pending.pop()
+                future = pool.submit(_scan_dir, path, st, root_dev, exclude, record, on_dir, reuse)
+                future.path = path
+                in_flight.add(future)
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                records, subdirs, errors, ops = future.result()
+                counters['errors'] += errors
+                if done:
+                    done(future.path, records, subdirs)
+                if throttle:
+                    throttle.consume(ops)
+                pending.extend(subdirs)
+                yield from records
@@ -0,0 +1,221 @@
+# Наблюдение за изменениями в реальном времени (-watch) через inotify.
+# inotify вызывается из libc через ctypes: каждый каталог дерева получает
+# свой watch (новые каталоги добавляются по мере создания). События копятся
+# пачкой в течение interval секунд и объединяются по пути, поэтому серия
+# записей в один файл даёт одну строку. Для каждого пути после пачки
+# выполняется lstat и создаётся TimelineEntry со статусом:
+#   +  файл создан (или перемещён в дерево)
+#   ~  изменено содержимое
+#   m  изменены права или владелец
+#   -  файл удалён (или перемещён из дерева)
+
+import ctypes
+import errno
+import os
+import select
+import stat
+import struct
+import sys
+import time
+
+from timeline.table import TimelineEntry
+from timeline.walker import mapped_user_name, user_name
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+EVENT = struct.Struct('iIII')
+NS = 1000000000
+
+
+# Функция загрузки функций inotify из libc
+def _libc():
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class Watcher:
+    # root - корень наблюдения; exclude - ExcludeMatcher (исключённые каталоги
+    # не наблюдаются); users - словарь uid -> имя для образов (как у walk_tree)
+    def __init__(self, root='/', exclude=None, xdev=True, users=None):
+        self.libc = _libc()
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.exclude = exclude
+        self.dirs = {}
+        self.unwatched = 0
+        self.lost = 0
+        # Владелец и права файлов (из базового сканирования и событий) для строк удаления
+        self.known = {}
+        self.moves = {}
+        self.user_cache = {}
+        self.users = users
+        root_st = os.lstat(root)
+        self.root_dev = root_st.st_dev if xdev else None
+        self._add_tree(root)
+
+    def close(self):
+        os.close(self.fd)
+
+    def _user(self, uid):
+        if self.users is not None:
+            return mapped_user_name(uid, self.users)
+        return user_name(uid, self.user_cache)
+
+    # Функция добавления watch на каталоги поддерева; возвращает найденные в нём файлы
+    def _add_tree(self, top):
+        files = []
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                # ENOSPC - исчерпан fs.inotify.max_user_watches
+                if ctypes.get_errno() in (errno.ENOSPC, errno.ENOMEM):
+                    self.unwatched += 1
+                continue
+            self.dirs[wd] = path
+            prefix = path if path.endswith('/') else path + '/'
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        full = prefix + entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.root_dev is not None and entry.stat(follow_symlinks=False).st_dev != self.root_dev:
+                                    continue
+                                if not (self.exclude and self.exclude.prunes(full)):
+                                    stack.append(full)
+                            elif entry.is_file(follow_symlinks=False):
+                                files.append(full)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return files
+
+    # Функция запоминания владельца и прав файлов базового сканирования
+    # (записи TimelineEntry), чтобы строки их удаления были полными
+    def remember(self, entries):
+        known = self.known
+        for entry in entries:
+            known[os.fsdecode(entry.filename)] = (entry.user, entry.permissions)
+
+    # Функция снятия watch с поддерева, перемещённого за пределы дерева
+    def _drop_tree(self, top):
+        for wd, path in list(self.dirs.items()):
+            if path == top or path.startswith(top + '/'):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    # Функция переименования наблюдаемых каталогов после перемещения внутри дерева
+    def _rename_tree(self, old, new):
+        for wd, path in self.dirs.items():
+            if path == old or path.startswith(old + '/'):
+                self.dirs[wd] = new + path[len(old):]
+
+    # Функция чтения доступных событий: пары (путь, маска) для файлов
+    def _read_events(self, pending):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+                name = data[offset + EVENT.size:offset + EVENT.size + length].split(b'\0', 1)[0]
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.lost += 1
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                parent = self.dirs.get(wd)
+                if parent is None or not name:
+                    continue
+                path = os.path.join(parent, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & IN_MOVED_FROM:
+                        self.moves[cookie] = path
+                    elif mask & IN_MOVED_TO and cookie in self.moves:
+                        self._rename_tree(self.moves.pop(cookie), path)
+                    elif mask & (IN_CREATE | IN_MOVED_TO) and not (self.exclude and self.exclude.prunes(path)):
+                        # Файлы, появившиеся до установки watch, считаются созданными
+                        for fn in self._add_tree(path):
+                            pending[fn] = pending.get(fn, 0) | IN_CREATE
+                    continue
+                pending[path] = pending.get(path, 0) | mask
+
+    # Функция преобразования накопленной пачки в записи TimelineEntry
+    def _flush(self, pending):
+        # Каталог, для которого за пачку не пришло парного IN_MOVED_TO, перемещён
+        # за пределы дерева: его watch снимаются, а известные файлы в нём удалены
+        for top in self.moves.values():
+            self._drop_tree(top)
+            for path in [path for path in self.known if path.startswith(top + '/')]:
+                pending[path] = pending.get(path, 0) | IN_MOVED_FROM
+        self.moves.clear()
+        entries = []
+        now = time.time_ns()
+        for path, mask in pending.items():
+            if self.exclude and self.exclude.excludes(path):
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError:
+                st = None
+            if st is not None and stat.S_ISREG(st.st_mode):
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    status = '+'
+                elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                    status = '~'
+                else:
+                    status = 'm'
+                user, perm = self._user(st.st_uid), format(st.st_mode & 0o7777, 'o')
+                self.known[path] = (user, perm)
+                ns = st.st_ctime_ns
+                entries.append(TimelineEntry(ns // NS, user, perm, str(st.st_size), path, 'N/A', ns, status=status))
+            elif st is None and mask & (IN_DELETE | IN_MOVED_FROM):
+                # Владелец неизвестен только у файлов, созданных и удалённых внутри одной пачки
+                user, perm = self.known.pop(path, ('?', ''))
+                entries.append(TimelineEntry(now // NS, user, perm, '0', path, 'N/A', now, status='-'))
+        entries.sort(key=lambda entry: entry.timestamp_ns)
+        return entries
+
+    # Функция бесконечного потока записей: пачки событий за interval секунд
+    def entries(self, interval=1.0):
+        pending = {}
+        deadline = None
+        lost = 0
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if select.select([self.fd], [], [], timeout)[0]:
+                self._read_events(pending)
+                if pending and deadline is None:
+                    deadline = time.monotonic() + interval
+            if deadline is not None and time.monotonic() >= deadline:
+                yield from self._flush(pending)
+                pending = {}
+                deadline = None
+            if self.lost != lost:
+                lost = self.lost
+                print("inotify queue overflow: some events were lost", file=sys.stderr)
@@ -0,0 +1,142 @@
+# Построчные выводы временной шкалы: консоль, CSV и обычный HTML.
+# Потоковый HTML и колоночный экспорт - в timeline.html_report и
+# timeline.columnar; модули csv, html и графики импортируются при вызове.
+
+import datetime
+import os
+import sys
+
+# Управляющие символы в именах (перевод строки, табуляция) ломали бы построчный вывод
+CONTROL_ESCAPES = {code: f'\\x{code:02x}' for code in range(32)}
+CONTROL_ESCAPES.update({ord('\n'): '\\n', ord('\t'): '\\t', ord('\r'): '\\r'})
+
+
+# Функция для форматирования размера файла
+def sizeof_fmt(num, suffix="B"):
+    for unit in ["", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"]:
+        if abs(num) < 1024.0:
+            return "{:3.1f}{}{}".format(num, unit, suffix)
+        num /= 1024.0
+    return "{:.1f}Yi{}".format(num, suffix)
+
+
+# Функция вывода пути: пути приходят из сборщика в байтах и декодируются
+# только здесь, байты не в UTF-8 выводятся как \xNN. Строки (пути из -watch,
+# декодированные os.fsdecode) сначала возвращаются к исходным байтам.
+def format_path(path):
+    if not isinstance(path, bytes):
+        path = os.fsencode(path)
+    return path.decode('utf-8', 'backslashreplace')
+
+
+# Функция вывода пути в строку консоли с экранированием управляющих символов
+def format_path_line(path):
+    return format_path(path).translate(CONTROL_ESCAPES)
+
+
+# Функция форматирования времени изменения
+def format_ctime(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Функция форматирования времени события с наносекундами (-macb)
+def format_time_ns(timestamp_ns):
+    return '{}.{:09d}'.format(format_ctime(timestamp_ns // 1000000000), timestamp_ns % 1000000000)
+
+
+# Функция столбцов времени записи: в режиме -macb - флаги события и время
+# с наносекундами, иначе - время изменения inode с точностью до секунды
+def _time_columns(entry, macb):
+    if macb:
+        return [entry.macb, format_time_ns(entry.timestamp_ns)]
+    return [format_ctime(entry.timestamp)]
+
+
+# Функция вывода временной шкалы в консоль или файл; hosts добавляет столбец
+# хоста, macb - флаги события MACB и время с наносекундами, status - статус
+# изменения (+ ~ m -) в начале строки, triage - оценку и признаки (-triage);
+# flush сбрасывает вывод после каждой строки
+def print_timeline(timeline_data, outfile=None, hosts=False, macb=False, status=False, flush=False, triage=False):
+    outfile = outfile or sys.stdout
+    for entry in timeline_data:
+        line = "{:>8}\t{}\t{:>10}\t{:>20}\t{}\t{}".format(entry.user, entry.permissions, sizeof_fmt(int(entry.size)),
+                                                          '\t'.join(_time_columns(entry, macb)),
+                                                          format_path_line(entry.filename), entry.hash)
+        if hosts:
+            line = f"{entry.host}\t{line}"
+        if status:
+            line = f"{entry.status}\t{line}"
+        if triage:
+            line = f"{entry.score:>4}\t{entry.reasons:<24}\t{line}"
+        print(line, file=outfile, flush=flush)
+
+
+# Функция HTML-блока с графиком по гистограмме
+def graph_html(histogram):
+    from timeline.graph import generate_timeline_graph
+    img_data = generate_timeline_graph(histogram)
+    return f'<h2>Timeline Graph</h2><img src="data:image/png;base64,{img_data}"/>' if img_data else ''
+
+
+# Функция для генерации HTML отчета с графиком. В табличном режиме гистограмма
+# уже заполнена и график идёт перед таблицей, в потоковом - после неё.
+def generate_html_report(timeline_data, output_file, histogram=None, hosts=False, macb=False, triage=False):
+    import html
+
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # Добавляем текущую дату на одной строке
+    with open(output_file, 'w') as f:
+        f.write(f'''
+        <html><head><title>Forensic Timeline</title></head>
+        <body><h1>Анализ выполнен {now}</h1>''')
+
+        graph_written = False
+        if histogram and histogram.total:
+            f.write(graph_html(histogram))
+            graph_written = True
+
+        lead_th = ('<th>Оценка</th><th>Признаки</th>' if triage else '') + ('<th>Хост</th>' if hosts else '')
+        time_th = '<th>MACB</th><th>Время события</th>' if macb else '<th>Время изменения</th>'
+        f.write(f'''
+        <h1>Timeline</h1><table border="1">
+        <tr>{lead_th}<th>Пользователь</th><th>Права</th><th>Размер</th>{time_th}<th>Файл</th><th>Хэш</th></tr>
+        ''')
+
+        for entry in timeline_data:
+            size_fmt = sizeof_fmt(int(entry.size))
+            time_td = ''.join(f"<td>{html.escape(value)}</td>" for value in _time_columns(entry, macb))
+            lead_td = f"<td>{entry.score}</td><td>{html.escape(entry.reasons)}</td>" if triage else ''
+            if hosts:
+                lead_td += f"<td>{html.escape(entry.host)}</td>"
+            f.write(f"<tr>{lead_td}<td>{html.escape(entry.user)}</td><td>{html.escape(entry.permissions)}</td>"
+                    f"<td>{html.escape(size_fmt)}</td>{time_td}<td>{html.escape(format_path(entry.filename))}</td>"
+                    f"<td>{html.escape(entry.hash)}</td></tr>")
+
+        f.write("</table>")
+        if histogram and not graph_written:
+            f.write(graph_html(histogram))
+        f.write("</body></html>")
+
+
+# Функция для генерации CSV отчета; flush - построчная буферизация файла
+# для непрерывного дописывания (-watch)
+def generate_csv_report(timeline_data, output_file, hosts=False, macb=False, status=False, flush=False,
+                        triage=False):
+    import csv
+
+    with open(output_file, 'w', newline='', buffering=1 if flush else -1) as csvfile:
+        csvwriter = csv.writer(csvfile)
+        time_header = ['MACB', 'Время события'] if macb else ['Время изменения']
+        header = ['Пользователь', 'Права', 'Размер'] + time_header + ['Файл', 'Хэш']
+        prefix = ((['Оценка', 'Признаки'] if triage else []) + (['Событие'] if status else []) +
+                  (['Хост'] if hosts else []))
+        csvwriter.writerow(prefix + header)
+        for entry in timeline_data:
+            size_fmt = sizeof_fmt(int(entry.size))
+            row = [entry.user, entry.permissions, size_fmt] + _time_columns(entry, macb) + [format_path(entry.filename), entry.hash]
+            if hosts:
+                row.insert(0, entry.host)
+            if status:
+                row.insert(0, entry.status)
+            if triage:
+                row[:0] = [entry.score, entry.reasons]
+            csvwriter.writerow(row)
@@ -1,18 +1,21 @@
 #!/usr/bin/python3
 
 from subprocess import Popen, PIPE, DEVNULL
+import os
 import re
 import sys
 import argparse
 import datetime
 
-IGNORED_PATTERNS = ["/usr/lib/modules", "/lib/modules", "/var/lib",
-                    "/usr/share", "/usr/lib/python", "/boot", "/usr/lib/systemd", "/var/cache/",
-                    "/usr/lib/udev", "/etc/alternatives", "/etc/ssl"]
+from timeline.exclude import ExcludeMatcher, load_ignore_file
+
+# Шаблоны исключений по умолчанию лежат рядом со скриптом
+IGNORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ignore_default.txt')
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-c', action='store_true', help='show changed files (slow)')
 parser.add_argument('-f', type=argparse.FileType('w'), help='outfile for timeline')
+parser.add_argument('-ignore-file', default=IGNORE_FILE, help=f'file with exclusion patterns (default: {IGNORE_FILE})')
 args = parser.parse_args()
 
 
@@ -33,8 +36,10 @@ def get_package_files():
 
 def get_timeline():
     process = Popen(["find", "/", "-type", "d,f", "-xdev", "-printf", "%C@;%y%m;%u;%s;%p\n"], stdout=PIPE, stderr=DEVNULL)
-    output, err = process.communicate()
-    return output.decode("utf-8").split("\n")[:-1]  # last line is empty
+    with process.stdout:
+        for line in process.stdout:
+            yield line.decode("utf-8", errors="replace").rstrip("\n")
+    process.wait()
 
 
 def sizeof_fmt(num, suffix="B"):
@@ -46,20 +51,22 @@ def sizeof_fmt(num, suffix="B"):
 
 
 def show_timeline():
-    timeline = get_timeline()
-    print("Files cnt: {}".format(len(timeline)))
     packageset = get_package_files()
     print("Files from repositories: {}".format(len(packageset)))
+    ignored = ExcludeMatcher(load_ignore_file(args.ignore_file))
+    files_cnt = 0
     filtered_timeline = []
-    for fl in timeline:
+    for fl in get_timeline():
+        files_cnt += 1
         data = fl.split(";")
         ts = int(data[0].split('.')[0])
         perm = data[1]
         user = data[2]
         size = data[3]
         fname = ";".join(fl.split(";")[4:])
-        if fname not in packageset and not any([fname.startswith(x) for x in IGNORED_PATTERNS]):
+        if fname not in packageset and not ignored.excludes(fname):
             filtered_timeline.append((ts, user, perm, size, fname))
+    print("Files cnt: {}".format(files_cnt))
     print("Filtered timeline: {}".format(len(filtered_timeline)))
     outfile = args.f if args.f else sys.stdout
     for line in sorted(filtered_timeline, reverse=True):